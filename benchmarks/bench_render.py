@@ -0,0 +1,73 @@
+"""Micro-benchmark: per-article render cost in generate_html.py.
+
+Compares the original render path (markdown.markdown() + two
+HTML_TEMPLATE.format() calls per article) with the current one (warm
+converter + precompiled template chunks).
+
+Usage: python3 benchmarks/bench_render.py [--repeat N]
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import markdown
+import generate_html as gh
+
+TIMESTAMP = "01/01/2025 00:00"
+STYLE = gh.inline_style()
+CHUNKS = gh.compile_template(gh.HTML_TEMPLATE, STYLE)
+# The template as it was before precompilation: CSS inlined, braces escaped
+OLD_TEMPLATE = gh.HTML_TEMPLATE.replace("{style}", STYLE.replace("{", "{{").replace("}", "}}"))
+
+def render_old(text):
+    title = gh.get_title(text)
+    html_content = markdown.markdown(text, extensions=gh.MARKDOWN_EXTENSIONS)
+    content_template = OLD_TEMPLATE.split('<div class="footer">')[0]
+    content_template.format(title=title, content=html_content, timestamp="")
+    return OLD_TEMPLATE.format(title=title, content=html_content, timestamp=TIMESTAMP).encode('utf-8')
+
+def render_new(text):
+    title = gh.get_title(text)
+    return gh.fill_page(CHUNKS, title, gh.convert_markdown(text), TIMESTAMP)
+
+def best_of(func, texts, repeat):
+    # Best wall time for one pass over all articles
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in texts:
+            func(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    texts = []
+    for path in sorted(glob.glob(os.path.join(ROOT, "articles", "*.md"))):
+        with open(path, 'r', encoding='utf-8') as f:
+            texts.append(f.read())
+    if not texts:
+        print("No articles found.")
+        return
+
+    # Both paths must produce the same page
+    for text in texts:
+        assert render_old(text) == render_new(text)
+
+    old = best_of(render_old, texts, args.repeat) / len(texts)
+    new = best_of(render_new, texts, args.repeat) / len(texts)
+    print(f"Articles: {len(texts)} (best of {args.repeat})")
+    print(f"old render: {old * 1e3:8.3f} ms/article")
+    print(f"new render: {new * 1e3:8.3f} ms/article")
+    print(f"speedup:    {old / new:8.2f}x")
+
+if __name__ == "__main__":
+    main()
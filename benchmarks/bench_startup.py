@@ -0,0 +1,128 @@
+"""Startup-time guard for the command-line scripts.
+
+Times runs that should find nothing to do, each as a fresh process:
+
+  python          bare interpreter start, for reference
+  build_noop      generate_html.py --search --citations, every article clean
+  suggest_clean   update_diary.py --suggest with nothing staged
+  extract_cached  extract_pdf.py on a PDF whose pages are all cached
+
+and checks that none of them imports the heavy libraries it doesn't
+need (markdown, pypdf, the process pool). Prints a JSON report; exits
+with status 1 if a median takes more than --max-ms over the bare
+interpreter start or a heavy import slips in. The default of 100 ms
+fails the eager-import code (a 149 ms no-op build on a 12 ms python).
+
+Usage: python3 benchmarks/bench_startup.py [--repeat N] [--max-ms MS]
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import synth_corpus
+
+HEAVY = ("markdown", "pypdf", "PyPDF2", "concurrent.futures.process")
+
+def imported_modules(args, cwd):
+    # Top-level names of every module the command imported (-X importtime)
+    proc = subprocess.run([sys.executable, "-X", "importtime"] + args, cwd=cwd,
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, encoding='utf-8')
+    names = set()
+    for line in proc.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            names.add(line.rsplit("|", 1)[1].strip())
+    return names
+
+def time_runs(args, cwd, repeat):
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + args, cwd=cwd, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        runs.append((time.perf_counter() - start) * 1000)
+    return runs
+
+def setup(workdir):
+    """A clean article build, a git repo with nothing staged and a warm
+    page cache, all inside workdir. Returns {scenario: (args, cwd)}."""
+    site = os.path.join(workdir, "site")
+    os.makedirs(os.path.join(site, "articles"))
+    for path in glob.glob(os.path.join(ROOT, "articles", "*.md")):
+        shutil.copy(path, os.path.join(site, "articles"))
+    build = [os.path.join(ROOT, "generate_html.py"), "--search", "--citations"]
+    subprocess.run([sys.executable] + build, cwd=site, check=True, stdout=subprocess.DEVNULL)
+
+    repo = os.path.join(workdir, "repo")
+    os.makedirs(repo)
+    for cmd in (["init", "-q"], ["-c", "user.name=bench", "-c", "user.email=bench@localhost",
+                                 "commit", "-q", "--allow-empty", "-m", "init"]):
+        subprocess.run(["git"] + cmd, cwd=repo, check=True)
+
+    pdf = os.path.join(workdir, "bench.pdf")
+    synth_corpus.write_pdf(pdf, 50, random.Random(1))
+    extract = [os.path.join(ROOT, "extract_pdf.py"), pdf, "--cache", os.path.join(workdir, "pages.sqlite3")]
+    subprocess.run([sys.executable] + extract, cwd=workdir, check=True, stdout=subprocess.DEVNULL)
+
+    return {
+        "python": (["-c", "pass"], workdir),
+        "build_noop": (build, site),
+        "suggest_clean": ([os.path.join(ROOT, "update_diary.py"), "--suggest"], repo),
+        "extract_cached": (extract, workdir),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--max-ms", type=float, default=100,
+                        help="fail if any scenario's median is more than this over the bare python start")
+    parser.add_argument("-o", "--output", help="write the JSON report to this file")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="ppp-startup-")
+    try:
+        scenarios = setup(workdir)
+        results = {}
+        failed = False
+        baseline = None
+        for name, (cmd, cwd) in scenarios.items():
+            runs = time_runs(cmd, cwd, args.repeat)
+            heavy = sorted(m for m in imported_modules(cmd, cwd) if m in HEAVY)
+            median = statistics.median(runs)
+            if baseline is None:
+                baseline = median  # the bare "python" scenario runs first
+            ok = median - baseline <= args.max_ms and not heavy
+            failed = failed or not ok
+            results[name] = {
+                "median_ms": round(median, 1),
+                "over_python_ms": round(median - baseline, 1),
+                "min_ms": round(min(runs), 1),
+                "heavy_imports": heavy,
+                "ok": ok,
+            }
+            print(f"{'✅' if ok else '❌'} {name}: {median:.1f} ms" + (f" (imports {', '.join(heavy)})" if heavy else ""),
+                  file=sys.stderr)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {"python": sys.version.split()[0], "max_ms": args.max_ms, "repeat": args.repeat, "results": results}
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
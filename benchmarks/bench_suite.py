@@ -0,0 +1,139 @@
+"""Scaling benchmarks for the build, the diary and PDF extraction.
+
+Generates a synthetic corpus (see synth_corpus.py) in a temporary
+directory and times the real command-line tools against it, each run as
+a fresh process the way ppp runs them:
+
+  full_build      generate_html.py --search on a clean output folder
+  noop_build      the same again with nothing changed
+  diary_migrate   first diary command: split the single-file diary into months
+  diary_insert    update_diary.py content "..." (one new entry)
+  read_latest     update_diary.py --read-latest
+  extract_cold    extract_pdf.py on the big PDF, no page cache
+  extract_warm    the same with a warm page cache
+
+Results go to stdout (or --output) as JSON, so runs from different
+versions can be compared.
+
+Usage: python3 benchmarks/bench_suite.py [--articles N] [--days N] [--pages N] [--repeat N] [-o FILE]
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import synth_corpus
+
+def tool(name):
+    return os.path.join(ROOT, name)
+
+def run(args, cwd):
+    # Wall time of one command, output discarded
+    start = time.perf_counter()
+    subprocess.run([sys.executable] + args, cwd=cwd, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+def measure(args, cwd, repeat, before=None):
+    runs = []
+    for _ in range(repeat):
+        if before:
+            before()
+        runs.append(run(args, cwd))
+    return {
+        "runs_s": [round(t, 4) for t in runs],
+        "median_s": round(statistics.median(runs), 4),
+        "min_s": round(min(runs), 4),
+    }
+
+def git_version():
+    try:
+        return subprocess.check_output(["git", "describe", "--always", "--dirty"], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL, encoding='utf-8').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_suite(corpus, repeat):
+    results = {}
+    output_dir = os.path.join(corpus, "articles", "html")
+    build = [tool("generate_html.py"), "--search"]
+
+    def clean_output():
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+    print("⏱  full_build", file=sys.stderr)
+    results["full_build"] = measure(build, corpus, repeat, before=clean_output)
+    print("⏱  noop_build", file=sys.stderr)
+    results["noop_build"] = measure(build, corpus, repeat)
+
+    # The first diary command migrates the legacy single-file diary
+    print("⏱  diary_migrate", file=sys.stderr)
+    results["diary_migrate"] = measure([tool("update_diary.py"), "--read-latest"], corpus, 1)
+    print("⏱  diary_insert", file=sys.stderr)
+    results["diary_insert"] = measure([tool("update_diary.py"), "content", "บันทึกทดสอบประสิทธิภาพ",
+                                       "วัดเวลาการเพิ่มบันทึก"], corpus, repeat)
+    print("⏱  read_latest", file=sys.stderr)
+    results["read_latest"] = measure([tool("update_diary.py"), "--read-latest"], corpus, repeat)
+
+    pdf = os.path.join(corpus, "references", "synthetic.pdf")
+    text_dir = os.path.join(corpus, "extracted")
+    cache = os.path.join(corpus, ".cache", "pages.sqlite3")
+    print("⏱  extract_cold", file=sys.stderr)
+    results["extract_cold"] = measure([tool("extract_pdf.py"), pdf, "--no-cache", "-o", text_dir], corpus, repeat)
+    run([tool("extract_pdf.py"), pdf, "--cache", cache, "-o", text_dir], corpus)
+    print("⏱  extract_warm", file=sys.stderr)
+    results["extract_warm"] = measure([tool("extract_pdf.py"), pdf, "--cache", cache, "-o", text_dir], corpus, repeat)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--articles", type=int, default=200)
+    parser.add_argument("--days", type=int, default=3000)
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--corpus", help="build the corpus here and keep it (default: a temporary directory)")
+    parser.add_argument("-o", "--output", help="write the JSON report to this file")
+    args = parser.parse_args()
+
+    corpus = args.corpus or tempfile.mkdtemp(prefix="ppp-bench-")
+    try:
+        print(f"📦 Generating corpus in {corpus}", file=sys.stderr)
+        started = time.perf_counter()
+        params = synth_corpus.generate(corpus, args.articles, args.days, args.pages, args.seed)
+        params["generate_s"] = round(time.perf_counter() - started, 3)
+        params["repeat"] = args.repeat
+
+        report = {
+            "version": git_version(),
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "corpus": params,
+            "results": run_suite(corpus, args.repeat),
+        }
+    finally:
+        if not args.corpus:
+            shutil.rmtree(corpus, ignore_errors=True)
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+        print(f"✅ Wrote {args.output}", file=sys.stderr)
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    main()
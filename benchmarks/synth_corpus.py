@@ -0,0 +1,153 @@
+"""Synthetic corpus for the benchmark suite.
+
+Writes a throwaway repo-shaped tree: Thai articles in variant families
+(articles/), a single-file diary with thousands of days (git_diary.md,
+split into month shards on first use like a real legacy diary) and a
+multi-hundred-page PDF (references/). Output is deterministic per seed.
+
+Usage: python3 benchmarks/synth_corpus.py DIR [--articles N] [--days N] [--pages N]
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import diary_store
+
+WORDS = [
+    "สัญญา", "ผู้รับจ้าง", "ผู้ว่าจ้าง", "ค่าปรับ", "ขยายเวลา", "หน่วยงานของรัฐ",
+    "เหตุสุดวิสัย", "พัสดุ", "คณะกรรมการ", "ตรวจรับ", "ส่งมอบ", "พื้นที่",
+    "ระเบียบ", "มาตรา", "วินิจฉัย", "ข้อเท็จจริง", "หลักฐาน", "งวดงาน",
+    "แจ้งเหตุ", "ภายใน", "วัน", "ความล่าช้า", "พฤติการณ์", "การพิจารณา",
+    "งด", "ลด", "และ", "หรือ", "ตาม", "ของ", "ให้", "ได้", "ไม่", "ต้อง",
+]
+VARIANTS = ["simple", "executive", "contractor"]
+SHARED_SECTIONS = 4
+
+def sentence(rng, words=12):
+    return "".join(rng.choice(WORDS) for _ in range(words)) + " มาตรา " + str(rng.randint(1, 130))
+
+def section(rng, number):
+    # One heading with a paragraph, a list and sometimes a table
+    lines = [f"## {number}. {sentence(rng, 4)}", "", sentence(rng, 40), ""]
+    lines += [f"*   **{sentence(rng, 3)}:** {sentence(rng, 15)}" for _ in range(rng.randint(2, 5))]
+    if rng.random() < 0.3:
+        lines += ["", "| ประเด็น | รายละเอียด |", "| :--- | :--- |"]
+        lines += [f"| {sentence(rng, 2)} | {sentence(rng, 8)} |" for _ in range(rng.randint(2, 6))]
+    return "\n".join(lines) + "\n"
+
+def references(rng):
+    lines = ["## 📚 แหล่งอ้างอิง (References)", ""]
+    for n in range(1, rng.randint(2, 6)):
+        lines.append(f"*   **[{n}] คำพิพากษาศาลปกครองสูงสุดที่ อ. {rng.randint(1, 2000)}/{rng.randint(2545, 2568)}**: {sentence(rng, 6)}")
+    return "\n".join(lines) + "\n"
+
+def write_articles(root, count, rng):
+    """`count` articles; every fourth is a base with audience variants that
+    share its first sections, like procurement_act_section_102*.md."""
+    articles_dir = os.path.join(root, "articles")
+    os.makedirs(articles_dir, exist_ok=True)
+    written = 0
+    family = 0
+    while written < count:
+        family += 1
+        shared = [section(rng, n) for n in range(1, SHARED_SECTIONS + 1)]
+        names = [""]
+        if family % 4 == 0:
+            names += ["_" + v for v in VARIANTS]
+        for suffix in names[:count - written]:
+            sections = shared + [section(rng, n) for n in range(SHARED_SECTIONS + 1, rng.randint(6, 14))]
+            text = f"# บทความทดสอบที่ {family}{suffix}: {sentence(rng, 5)}\n\n" + "\n".join(sections) + "\n" + references(rng)
+            with open(os.path.join(articles_dir, f"article_{family:04d}{suffix}.md"), 'w', encoding='utf-8') as f:
+                f.write(text)
+            written += 1
+    return written
+
+def write_diary(root, days, rng, last_day=None):
+    """Legacy single-file diary (newest day first) ending the day before
+    `last_day`, so a benchmark insert lands in an existing month."""
+    last_day = (last_day or datetime.date.today()) - datetime.timedelta(days=1)
+    parts = [f"# {diary_store.DIARY_TITLE}\n\n"]
+    for offset in range(days):
+        day = last_day - datetime.timedelta(days=offset)
+        header = f"{diary_store.DATE_HEADER} {day.day} {diary_store.THAI_MONTHS[day.month - 1]} {day.year}"
+        entries = "".join(
+            f"*   **[{rng.randint(8, 22):02d}:{rng.randint(0, 59):02d}] 📝 {sentence(rng, 5)}**\n"
+            f"    > {sentence(rng, 20)}\n\n"
+            f"    *   *Files:* `article_{rng.randint(1, 999):04d}.md`\n\n"
+            for _ in range(rng.randint(1, 4)))
+        parts.append(f"{header}\n{diary_store.DEFAULT_SUMMARY}{diary_store.LOG_HEADER}\n{entries}{diary_store.DEFAULT_TAIL}")
+    with open(os.path.join(root, diary_store.INDEX_PAGE), 'w', encoding='utf-8') as f:
+        f.write("".join(parts))
+    return days
+
+def pdf_escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+def write_pdf(path, pages, rng, lines_per_page=40):
+    """Minimal text PDF written by hand (no PDF library needed).
+
+    Uses the built-in Helvetica font, so the text is Latin: Thai glyphs
+    would need an embedded font. Page breaks and text volume are what
+    extraction time depends on.
+    """
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in below
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    kids = []
+    for number in range(1, pages + 1):
+        body = [f"BT /F1 10 Tf 50 800 Td 12 TL (==Page {number}==) Tj"]
+        for _ in range(lines_per_page):
+            words = " ".join(f"clause{rng.randint(1, 200)}" for _ in range(10))
+            body.append(f"T* ({pdf_escape(words)}) Tj")
+        body.append("ET")
+        stream = "\n".join(body).encode('latin-1')
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_ref = len(objects)
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_ref)
+        kids.append(b"%d 0 R" % len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [" + b" ".join(kids) + b"] /Count %d >>" % pages
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + obj + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % off for off in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, 'wb') as f:
+        f.write(out)
+    return pages
+
+def generate(root, articles=200, days=3000, pages=300, seed=1):
+    """Write the whole corpus under `root`; returns what was written."""
+    rng = random.Random(seed)
+    os.makedirs(os.path.join(root, "references"), exist_ok=True)
+    return {
+        "articles": write_articles(root, articles, rng),
+        "diary_days": write_diary(root, days, rng),
+        "pdf_pages": write_pdf(os.path.join(root, "references", "synthetic.pdf"), pages, rng),
+        "seed": seed,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("root", help="directory to write the corpus into")
+    parser.add_argument("--articles", type=int, default=200)
+    parser.add_argument("--days", type=int, default=3000)
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    print(generate(args.root, args.articles, args.days, args.pages, args.seed))
+
+if __name__ == "__main__":
+    main()
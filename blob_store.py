@@ -0,0 +1,319 @@
+import os
+import sys
+import glob
+import json
+import shutil
+import fnmatch
+import argparse
+import subprocess
+
+import file_state
+
+# Large binaries (PDFs, audio) live outside git history: the repo keeps a
+# small pointer file next to each one ("name.pdf.blob") and the bytes go
+# to a content-addressed store, one copy per sha256, shared by every file
+# with the same content. Nothing happens until a blob remote is set.
+# The binary itself stays in the working tree; git stops tracking it (and
+# lists it in .gitignore) only once its blob is on the blob remote. A
+# `git pull` that brings that change into another clone deletes the file
+# there, so `bbb` runs `blob_store.py checkout` right after the pull to
+# restore it from the remote (each clone needs ppp.blobRemote set too).
+#   git config ppp.blobDir PATH      local store (default .git/ppp-blobs)
+#   git config ppp.blobRemote PATH   directory to push blobs to / fetch from
+# PPP_BLOB_DIR / PPP_BLOB_REMOTE override the git config.
+
+BLOB_DIRS = ("references",)
+BLOB_PATTERNS = ("*.pdf", "*.aac", "*.mp3", "*.m4a", "*.wav")
+POINTER_SUFFIX = ".blob"
+POINTER_HEADER = "ppp-blob v1"
+STAT_CACHE = "stat-cache.json"
+IGNORE_HEADER = "# Binaries kept in the blob store (blob_store.py)"
+
+def git_config(key):
+    try:
+        return subprocess.check_output(["git", "config", "--get", key], stderr=subprocess.DEVNULL,
+                                       encoding='utf-8').strip() or None
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def blob_dir():
+    path = os.environ.get("PPP_BLOB_DIR") or git_config("ppp.blobDir")
+    return path or os.path.join(".git", "ppp-blobs")
+
+def blob_remote():
+    return os.environ.get("PPP_BLOB_REMOTE") or git_config("ppp.blobRemote")
+
+def blob_path(store, sha):
+    return os.path.join(store, sha[:2], sha[2:])
+
+def is_binary(path):
+    name = os.path.basename(path)
+    return any(fnmatch.fnmatch(name, p) for p in BLOB_PATTERNS)
+
+def binaries():
+    """Working-tree files that belong in the blob store."""
+    found = []
+    for d in BLOB_DIRS:
+        for pattern in BLOB_PATTERNS:
+            found.extend(glob.glob(os.path.join(d, pattern)))
+    return sorted(set(found))
+
+def pointers():
+    found = []
+    for d in BLOB_DIRS:
+        found.extend(glob.glob(os.path.join(d, "*" + POINTER_SUFFIX)))
+    return sorted(found)
+
+def parse_pointer(text):
+    """{"sha256": ..., "size": ...} from a pointer file's text, or None."""
+    lines = text.splitlines()
+    if not lines or lines[0] != POINTER_HEADER:
+        return None
+    fields = dict(line.split(" ", 1) for line in lines[1:] if " " in line)
+    if "sha256" not in fields or "size" not in fields:
+        return None
+    return {"sha256": fields["sha256"], "size": int(fields["size"])}
+
+def read_pointer(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return parse_pointer(f.read())
+    except OSError:
+        return None
+
+def write_pointer(path, sha, size):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f"{POINTER_HEADER}\nsha256 {sha}\nsize {size}\n")
+
+def load_stat_cache(store):
+    try:
+        with open(os.path.join(store, STAT_CACHE), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_stat_cache(store, cache):
+    path = os.path.join(store, STAT_CACHE)
+    file_state.atomic_write_json(path, cache, indent=2, sort_keys=True)
+
+def copy_blob(src, store, sha):
+    # Copy into the store under its hash; an existing blob is never rewritten
+    target = blob_path(store, sha)
+    if os.path.exists(target):
+        return False
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmp_path = target + ".tmp"
+    shutil.copyfile(src, tmp_path)
+    if file_state.sha256_file(tmp_path) != sha:
+        os.remove(tmp_path)
+        raise IOError(f"blob {sha[:12]} changed while copying from {src}")
+    os.replace(tmp_path, target)
+    return True
+
+def store_binaries(store=None):
+    """Put every binary into the store and (re)write its pointer.
+
+    Files are only re-hashed when their size or mtime changed since the
+    last run. Returns the list of binaries whose pointer was written.
+    """
+    store = store or blob_dir()
+    os.makedirs(store, exist_ok=True)
+    cache = load_stat_cache(store)
+    new_cache = {}
+    written = []
+    for path in binaries():
+        _, st, sha, _ = file_state.check_file(path, cache.get(path), read=False)
+        if copy_blob(path, store, sha):
+            print(f"📦 Stored: {path} ({st.st_size // 1024} KB, {sha[:12]})")
+        new_cache[path] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": sha}
+        pointer = path + POINTER_SUFFIX
+        if read_pointer(pointer) != {"sha256": sha, "size": st.st_size}:
+            write_pointer(pointer, sha, st.st_size)
+            written.append(path)
+    if new_cache != cache:
+        save_stat_cache(store, new_cache)
+    return written
+
+def git_lines(*args):
+    # NUL-separated git output (pass -z) as a list of paths
+    out = subprocess.run(["git", *args], stdout=subprocess.PIPE, check=True).stdout.decode('utf-8')
+    return [p for p in out.split("\0") if p]
+
+def tracked_binaries():
+    return [p for p in git_lines("ls-files", "-z", "--", *BLOB_DIRS) if is_binary(p)]
+
+def ignore_binaries(paths):
+    """List untracked binaries in .gitignore (committed, so other clones
+    ignore them too once `checkout` has restored them)."""
+    try:
+        with open(".gitignore", 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+    except OSError:
+        lines = []
+    missing = [f"/{p}" for p in paths if f"/{p}" not in lines]
+    if not missing:
+        return
+    if IGNORE_HEADER not in lines:
+        lines += ["", IGNORE_HEADER]
+    at = lines.index(IGNORE_HEADER) + 1
+    while at < len(lines) and lines[at].startswith("/"):
+        at += 1
+    lines[at:at] = missing
+    with open(".gitignore", 'w', encoding='utf-8') as f:
+        f.write("\n".join(lines) + "\n")
+
+def untrack_binaries(remote=None):
+    """Drop tracked binaries from the index once their blob is safely on
+    the blob remote (the files stay on disk and are ignored from then on).
+
+    Without a remote nothing is untracked: the blob would only exist on
+    this machine, and every other clone would lose the file.
+    """
+    remote = remote or blob_remote()
+    tracked = tracked_binaries()
+    if not tracked:
+        return []
+    if not remote:
+        print(f"⚠️  {len(tracked)} binary file(s) stay in git until a blob remote is set "
+              "(git config ppp.blobRemote PATH)")
+        return []
+    try:
+        push_blobs(remote)
+    except OSError as e:
+        print(f"⚠️  Blob remote unavailable, binaries stay in git for now: {e}")
+        return []
+    cache = load_stat_cache(blob_dir())
+    safe = [p for p in tracked
+            if p in cache and os.path.exists(blob_path(remote, cache[p]["sha256"]))]
+    if safe:
+        subprocess.run(["git", "rm", "--cached", "-q", "--", *safe], check=True)
+        ignore_binaries(safe)
+        for path in safe:
+            print(f"📤 Untracked (kept as pointer): {path}")
+    return safe
+
+def stage_binaries():
+    """ppp step before `git add`: store binaries, refresh pointers, and
+    untrack the binaries whose blobs have reached the blob remote.
+
+    Does nothing without a blob remote: pointers committed next to
+    binaries that stay in git would only clutter every commit.
+    """
+    remote = blob_remote()
+    if not remote:
+        return []
+    store_binaries()
+    return untrack_binaries(remote)
+
+def unpushed_pointers(remote, commit="HEAD"):
+    """Pointers in commit whose binary is not committed alongside and
+    whose blob is not on the remote: pushing commit would lose the file."""
+    tree = git_lines("ls-tree", "-r", "-z", "--name-only", commit, "--", *BLOB_DIRS)
+    committed = set(tree)
+    missing = []
+    for pointer in tree:
+        if not pointer.endswith(POINTER_SUFFIX) or pointer[:-len(POINTER_SUFFIX)] in committed:
+            continue
+        text = subprocess.run(["git", "show", f"{commit}:{pointer}"], stdout=subprocess.PIPE,
+                              check=True).stdout.decode('utf-8')
+        info = parse_pointer(text)
+        if info is None or not remote or not os.path.exists(blob_path(remote, info["sha256"])):
+            missing.append(pointer[:-len(POINTER_SUFFIX)])
+    return missing
+
+def referenced_blobs():
+    # {sha: pointer path} for every pointer in the tree
+    refs = {}
+    for pointer in pointers():
+        info = read_pointer(pointer)
+        if info:
+            refs[info["sha256"]] = pointer
+    return refs
+
+def push_blobs(remote=None, store=None):
+    """Copy blobs the remote doesn't have yet. Returns the number copied;
+    raises if a referenced blob is missing locally."""
+    remote = remote or blob_remote()
+    store = store or blob_dir()
+    copied = 0
+    for sha, pointer in sorted(referenced_blobs().items()):
+        if os.path.exists(blob_path(remote, sha)):
+            continue
+        src = blob_path(store, sha)
+        if not os.path.exists(src):
+            raise IOError(f"blob for {pointer} ({sha[:12]}) is not in {store}")
+        copy_blob(src, remote, sha)
+        copied += 1
+        print(f"☁️  Pushed blob: {pointer[:-len(POINTER_SUFFIX)]} ({sha[:12]})")
+    return copied
+
+def checkout_blobs(remote=None, store=None):
+    """Restore binaries that are missing (or differ) in the working tree,
+    fetching blobs from the remote when the local store lacks them."""
+    remote = remote or blob_remote()
+    store = store or blob_dir()
+    restored = missing = 0
+    for sha, pointer in sorted(referenced_blobs().items()):
+        path = pointer[:-len(POINTER_SUFFIX)]
+        src = blob_path(store, sha)
+        if not os.path.exists(src) and remote and os.path.exists(blob_path(remote, sha)):
+            copy_blob(blob_path(remote, sha), store, sha)
+            print(f"⬇️  Fetched blob: {path} ({sha[:12]})")
+        if os.path.exists(path) and file_state.sha256_file(path) == sha:
+            continue
+        if not os.path.exists(src):
+            print(f"⚠️  Missing blob: {path} ({sha[:12]})", file=sys.stderr)
+            missing += 1
+            continue
+        shutil.copyfile(src, path)
+        restored += 1
+        print(f"✅ Restored: {path}")
+    if missing and not remote:
+        print("   Set the blob remote to fetch them: git config ppp.blobRemote PATH", file=sys.stderr)
+    return restored, missing
+
+def status(remote=None, store=None):
+    remote = remote or blob_remote()
+    store = store or blob_dir()
+    print(f"📁 Blob store: {store}")
+    print(f"☁️  Remote: {remote or '(none: git config ppp.blobRemote PATH)'}")
+    for pointer in pointers():
+        info = read_pointer(pointer)
+        path = pointer[:-len(POINTER_SUFFIX)]
+        if info is None:
+            print(f"   ❌ {pointer}: not a blob pointer")
+            continue
+        flags = [
+            "local" if os.path.exists(blob_path(store, info["sha256"])) else "NOT LOCAL",
+            ("remote" if os.path.exists(blob_path(remote, info["sha256"])) else "not pushed") if remote else "",
+            "" if os.path.exists(path) else "file missing",
+        ]
+        print(f"   {path}: {info['size'] // 1024} KB {info['sha256'][:12]} ({', '.join(f for f in flags if f)})")
+
+def main():
+    parser = argparse.ArgumentParser(description="Content-addressed storage for large binaries in references/.")
+    parser.add_argument("command", choices=("add", "push", "checkout", "status"),
+                        help="add: store binaries + write pointers; push: copy blobs to the remote; "
+                             "checkout: restore missing binaries; status: list pointers")
+    parser.add_argument("--remote", help="blob remote directory (default: git config ppp.blobRemote)")
+    args = parser.parse_args()
+
+    if args.command == "add":
+        if not blob_remote():
+            print("Error: no blob remote (git config ppp.blobRemote PATH)", file=sys.stderr)
+            sys.exit(1)
+        stage_binaries()
+    elif args.command == "push":
+        remote = args.remote or blob_remote()
+        if not remote:
+            print("Error: no blob remote (git config ppp.blobRemote PATH or --remote)", file=sys.stderr)
+            sys.exit(1)
+        print(f"✅ {push_blobs(remote)} blob(s) pushed to {remote}")
+    elif args.command == "checkout":
+        restored, missing = checkout_blobs(args.remote)
+        sys.exit(1 if missing else 0)
+    else:
+        status(args.remote)
+
+if __name__ == "__main__":
+    main()
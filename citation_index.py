@@ -0,0 +1,225 @@
+import os
+import re
+import sys
+import glob
+import json
+import argparse
+
+import file_state
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+CACHE_PATH = os.path.join(ROOT, ".cache", "citations.json")
+CACHE_VERSION = 1
+
+ARTICLES = "articles/*.md"
+REFERENCES = "references/ref_*.md"
+
+# Rulings are keyed like the summary files in references/ (ref_<key>.md):
+#   อ. 1766/2559                  -> sac_1766_2559  (Supreme Administrative Court)
+#   อสส. ที่ 84/2563              -> oag_84_2563    (Office of the Attorney General)
+#   กค (กวจ) 0405.4/11924         -> kwj_11924      (กวจ. letters: the number is unique,
+#                                                    the year is often not cited)
+RULING_PATTERNS = [
+    ("sac", re.compile(r'(?<![\u0e00-\u0e7f])อ\.\s*(\d+)/(\d{4})')),
+    ("oag", re.compile(r'อสส\.\s*(?:ที่\s*)?(\d+)/(\d{4})')),
+    ("kwj", re.compile(r'0405\.\d+\s*/\s*(?:ว\s*)?(\d+)')),
+]
+KIND_TITLES = {
+    "sac": "คำพิพากษาศาลปกครองสูงสุด",
+    "oag": "คำวินิจฉัยสำนักงานอัยการสูงสุด (อสส.)",
+    "kwj": "หนังสือคณะกรรมการวินิจฉัยฯ (กวจ.)",
+}
+REF_FILE = re.compile(r'ref_([a-z]+)_(\d+)_(\d{4})\.md$')
+LETTER_KINDS = ("kwj", "gwj")
+
+# The article section that lists its sources, e.g.
+# "## 📚 แหล่งอ้างอิงและข้อมูลเพิ่มเติม (References)"
+REFERENCES_HEADING = re.compile(r'^#+\s.*(?:reference|อ้างอิง)', re.I)
+HEADING = re.compile(r'^#+\s')
+LIST_ITEM = re.compile(r'^\s*(?:[*+-]|(\d+)\.)\s+(.*)')
+BRACKET_LABEL = re.compile(r'\[(\d+)\]')
+
+def ruling_spans(text):
+    """(start, end, key) of every ruling mentioned in text, in order and
+    without overlaps."""
+    found = []
+    for kind, pattern in RULING_PATTERNS:
+        for m in pattern.finditer(text):
+            found.append((m.start(), m.end(), "_".join((kind,) + m.groups())))
+    spans = []
+    for start, end, key in sorted(found):
+        if not spans or start >= spans[-1][1]:
+            spans.append((start, end, key))
+    return spans
+
+def ruling_keys(text):
+    """Ruling keys mentioned in a piece of text, in order of appearance."""
+    keys = []
+    for _, _, key in ruling_spans(text):
+        if key not in keys:
+            keys.append(key)
+    return keys
+
+def clean(text):
+    return ' '.join(re.sub(r'[*_`]+', '', text).split())
+
+def parse_article(text):
+    """Citations listed under the article's References heading.
+
+    Returns [{"label", "keys", "text"}]; label is the "[n]" (or list
+    number) the article uses, keys the rulings the item names.
+    """
+    citations = []
+    in_refs = False
+    for line in text.splitlines():
+        if HEADING.match(line):
+            in_refs = bool(REFERENCES_HEADING.match(line))
+            continue
+        if not in_refs:
+            continue
+        m = LIST_ITEM.match(line)
+        if not m:
+            continue
+        item = clean(m.group(2))
+        bracket = BRACKET_LABEL.match(item)
+        label = f"[{bracket.group(1)}]" if bracket else (f"[{m.group(1)}]" if m.group(1) else "")
+        if bracket:
+            item = item[bracket.end():].strip()
+        keys = ruling_keys(item)
+        if keys:
+            citations.append({"label": label, "keys": keys, "text": item})
+    return citations
+
+def parse_reference(path, text):
+    """Key and title of a ruling summary (references/ref_*.md)."""
+    title = ""
+    for line in text.splitlines():
+        if line.startswith("# "):
+            title = clean(line[2:])
+            break
+    keys = ruling_keys(title)
+    if keys:
+        key = keys[0]
+    else:
+        m = REF_FILE.search(os.path.basename(path))
+        if m:
+            kind, number, year = m.groups()
+            key = f"kwj_{number}" if kind in LETTER_KINDS else f"{kind}_{number}_{year}"
+        else:
+            key = os.path.basename(path)[len("ref_"):-len(".md")]
+    return {"key": key, "title": title}
+
+def load_cache(path=CACHE_PATH):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+        if cache.get("version") == CACHE_VERSION:
+            return cache
+    except (OSError, ValueError):
+        pass
+    return {"version": CACHE_VERSION, "files": {}}
+
+def save_cache(cache, path=CACHE_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    file_state.atomic_write_json(path, cache, indent=1, sort_keys=True)
+
+def update_cache(cache, root=ROOT, verbose=False):
+    """Re-parse only the files whose content changed (stat first, then
+    hash). Returns the number of entries added, updated or dropped."""
+    old_files = cache["files"]
+    new_files = {}
+    changed = 0
+    for pattern, parse in ((ARTICLES, None), (REFERENCES, parse_reference)):
+        for full_path in sorted(glob.glob(os.path.join(root, pattern))):
+            path = os.path.relpath(full_path, root)
+            entry = old_files.get(path)
+            state, st, digest, data = file_state.check_file(full_path, entry)
+            if state == "same":
+                new_files[path] = entry
+                continue
+            if state == "touched":
+                entry = dict(entry)
+            else:
+                if verbose:
+                    print(f"Parsing: {path}")
+                text = data.decode('utf-8', errors='replace')
+                entry = {"sha256": digest}
+                if parse is None:
+                    entry["citations"] = parse_article(text)
+                else:
+                    entry.update(parse(path, text))
+            entry.update(size=st.st_size, mtime_ns=st.st_mtime_ns)
+            changed += 1
+            new_files[path] = entry
+
+    changed += len(set(old_files) - set(new_files))
+    cache["files"] = new_files
+    return changed
+
+def build_graph(cache):
+    """Citation graph from the cached parses.
+
+    Returns {"rulings": {key: {"title", "source", "cited_by": [[article, label]]}},
+             "articles": {article: [key, ...]}}. Rulings cited without a
+    summary file get the article's wording as their title and no source.
+    """
+    rulings = {}
+    articles = {}
+    for path, entry in sorted(cache["files"].items()):
+        if "key" in entry:
+            ruling = rulings.setdefault(entry["key"], {"title": "", "source": None, "cited_by": []})
+            ruling.update(title=entry["title"] or ruling["title"], source=path)
+
+    for path, entry in sorted(cache["files"].items()):
+        if "citations" not in entry:
+            continue
+        article = os.path.basename(path)
+        keys = articles.setdefault(article, [])
+        for citation in entry["citations"]:
+            for key in citation["keys"]:
+                ruling = rulings.setdefault(key, {"title": "", "source": None, "cited_by": []})
+                if not ruling["title"]:
+                    ruling["title"] = citation["text"].split(":")[0].strip()
+                if key not in keys:
+                    keys.append(key)
+                    ruling["cited_by"].append([article, citation["label"]])
+    return {"rulings": rulings, "articles": articles}
+
+def load_graph(path=CACHE_PATH, root=ROOT, verbose=False):
+    """Bring the cache up to date and return the citation graph."""
+    cache = load_cache(path)
+    if update_cache(cache, root, verbose) or not os.path.exists(path):
+        save_cache(cache, path)
+    return build_graph(cache)
+
+def main():
+    parser = argparse.ArgumentParser(description="Show which articles cite which rulings (and the reverse).")
+    parser.add_argument("name", nargs="*", help="ruling keys (e.g. sac_1766_2559) or article files to show")
+    parser.add_argument("--cache", default=CACHE_PATH, help="citation cache (json)")
+    args = parser.parse_args()
+
+    graph = load_graph(args.cache, verbose=True)
+    names = set(args.name)
+    shown = 0
+    for key, ruling in sorted(graph["rulings"].items()):
+        if names and key not in names:
+            continue
+        shown += 1
+        print(f"⚖️  {key}: {ruling['title']}" + (f"  [{ruling['source']}]" if ruling["source"] else ""))
+        for article, label in ruling["cited_by"]:
+            print(f"   ← {article} {label}".rstrip())
+        if not ruling["cited_by"]:
+            print("   (ยังไม่มีบทความอ้างถึง)")
+    for article, keys in sorted(graph["articles"].items()):
+        if article not in names:
+            continue
+        shown += 1
+        print(f"📄 {article}")
+        for key in keys:
+            print(f"   → {key}: {graph['rulings'][key]['title']}")
+    if names and not shown:
+        print("ไม่พบรายการที่ระบุ")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
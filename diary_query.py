@@ -0,0 +1,267 @@
+import os
+import re
+import sys
+import glob
+import time
+import sqlite3
+import argparse
+import datetime
+
+import diary_store
+import file_state
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+INDEX_PATH = os.path.join(ROOT, ".cache", "diary.sqlite3")
+PARSER_VERSION = 1
+
+# Month shards first: when the v1 archive repeats an entry the shard's
+# copy is the one counted
+SOURCES = [
+    (os.path.join(diary_store.DIARY_DIR, "[0-9][0-9][0-9][0-9]-[0-9][0-9].md"), 0),
+    (diary_store.INDEX_PAGE, 1),
+    (diary_store.ARCHIVE_PAGE, 2),
+]
+
+# Entry lines, in the formats the diary has used over time:
+#   *   **[15:57] 📝 Message**             (current)
+#   *   **[2025-12-11 15:57] 📝**          (v1: message on the next line)
+#   **[2025-12-11 15:16] Message**         (v1, no bullet or icon)
+ENTRY = re.compile(r'^(?:\*\s+)?\*\*\[(?:(\d{4}-\d{2}-\d{2}) )?(\d{1,2}:\d{2})\]\s*(.*?)\*\*\s*$')
+LEADING_ICON = re.compile(r'^([^\w\s`*"\'(\[]+)\s*(.*)$')
+# v1 archive sections say which kind of work an entry was
+CATEGORY_HEADINGS = {"Content": "content", "System": "system"}
+ICON_CATEGORIES = {
+    "📝": "content", "✨": "content", "🧩": "content",
+    "🔧": "system", "🛠": "system", "⚙️": "system", "⚡": "system", "♻️": "system",
+}
+# File names in entry bodies: "*Files:* `a`, `b`", "📝 แก้ไข: path", `path`
+FILE_MENTION = re.compile(r'`([^`\s]+\.[A-Za-z0-9]+)`|(?:แก้ไข|สร้างใหม่|แก้ไขระบบ|ลบ):\s*(\S+)')
+
+def open_index(path=INDEX_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    db = sqlite3.connect(path)
+    db.executescript("""
+        CREATE TABLE IF NOT EXISTS sources (
+            id INTEGER PRIMARY KEY, path TEXT UNIQUE, priority INTEGER,
+            size INTEGER, mtime_ns INTEGER, sha256 TEXT, parser INTEGER);
+        CREATE TABLE IF NOT EXISTS entries (
+            id INTEGER PRIMARY KEY, source INTEGER, priority INTEGER,
+            date TEXT, time TEXT, category TEXT, icon TEXT, message TEXT, body TEXT);
+        CREATE TABLE IF NOT EXISTS files (
+            entry INTEGER, path TEXT, article TEXT);
+        CREATE INDEX IF NOT EXISTS entries_source ON entries (source);
+        CREATE INDEX IF NOT EXISTS entries_key ON entries (date, time, message, priority);
+        CREATE INDEX IF NOT EXISTS files_entry ON files (entry);
+        CREATE INDEX IF NOT EXISTS files_article ON files (article);
+        -- One row per entry: repeats (same date, time and message) in the
+        -- archive or further down the same file are dropped
+        CREATE VIEW IF NOT EXISTS diary AS
+            SELECT * FROM entries e WHERE NOT EXISTS (
+                SELECT 1 FROM entries o WHERE o.date = e.date AND o.time = e.time
+                AND o.message = e.message AND (o.priority < e.priority
+                    OR (o.priority = e.priority AND o.id < e.id)));
+    """)
+    return db
+
+def header_date(line):
+    # "## 📅 13 ธันวาคม 2025" -> "2025-12-13"
+    match = diary_store.THAI_DATE.search(line)
+    if not match:
+        return None
+    month = diary_store.THAI_MONTHS.index(match.group(2)) + 1
+    return f"{match.group(3)}-{month:02d}-{int(match.group(1)):02d}"
+
+def article_name(path):
+    # "articles/foo.md" or a bare "foo.md" that is an article -> "foo.md"
+    name = os.path.basename(path)
+    if not name.endswith(".md"):
+        return None
+    if path.startswith("articles/") or os.path.exists(os.path.join(ROOT, "articles", name)):
+        return name
+    return None
+
+def mentioned_files(text):
+    files = []
+    for match in FILE_MENTION.finditer(text):
+        path = (match.group(1) or match.group(2)).strip("`.,")
+        if path not in files:
+            files.append(path)
+    return files
+
+def parse_diary(text):
+    """Entries of one diary file as dicts (date, time, category, icon,
+    message, body, files), in file order."""
+    entries = []
+    date = None
+    heading_category = None
+    current = None
+
+    def finish():
+        if current is None:
+            return
+        body = "\n".join(current.pop("lines")).strip()
+        if not current["message"]:
+            # v1: the message is the first body line
+            first, _, body = body.partition("\n")
+            current["message"] = first.strip()
+            body = body.strip()
+        current["body"] = body
+        current["files"] = mentioned_files(current["message"] + "\n" + body)
+        entries.append(current)
+
+    for line in text.splitlines():
+        if line.startswith("#"):
+            finish()
+            current = None
+            if line.startswith("## "):
+                date = header_date(line) or date
+                heading_category = None
+            elif line.startswith("### "):
+                heading_category = next((c for word, c in CATEGORY_HEADINGS.items() if word in line), None)
+            continue
+        match = ENTRY.match(line)
+        if match:
+            finish()
+            entry_date, entry_time, rest = match.groups()
+            icon_match = LEADING_ICON.match(rest)
+            icon, message = (icon_match.groups() if icon_match else ("", rest))
+            category = heading_category or ICON_CATEGORIES.get(icon, "other")
+            current = {"date": entry_date or date, "time": f"{int(entry_time[:-3]):02d}{entry_time[-3:]}",
+                       "category": category, "icon": icon, "message": message.strip(), "lines": []}
+            continue
+        if current is not None:
+            current["lines"].append(line.strip().lstrip(">").strip())
+    finish()
+    return [e for e in entries if e["date"]]
+
+def source_files(root=ROOT):
+    found = {}
+    for pattern, priority in SOURCES:
+        for path in glob.glob(os.path.join(root, pattern)):
+            found.setdefault(os.path.relpath(path, root), priority)
+    return found
+
+def index_source(db, source_id, priority, text):
+    old = [row[0] for row in db.execute("SELECT id FROM entries WHERE source = ?", (source_id,))]
+    db.executemany("DELETE FROM files WHERE entry = ?", [(i,) for i in old])
+    db.execute("DELETE FROM entries WHERE source = ?", (source_id,))
+    entries = parse_diary(text)
+    for e in entries:
+        entry_id = db.execute(
+            "INSERT INTO entries (source, priority, date, time, category, icon, message, body) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (source_id, priority, e["date"], e["time"], e["category"], e["icon"], e["message"], e["body"])).lastrowid
+        db.executemany("INSERT INTO files VALUES (?, ?, ?)",
+                       [(entry_id, path, article_name(path)) for path in e["files"]])
+    return len(entries)
+
+def update_index(db, root=ROOT, verbose=False):
+    """Re-parse only the diary files that changed since the last query.
+
+    Past months never change, so a normal run costs one stat per file;
+    after ppp adds an entry only the current month is parsed again.
+    """
+    known = {row[0]: row[1:] for row in db.execute(
+        "SELECT path, id, size, mtime_ns, sha256, parser FROM sources")}
+    changed = 0
+
+    for path, priority in sorted(source_files(root).items()):
+        row = known.pop(path, None)
+        # Rows from an older parser are re-parsed whatever their stat says
+        entry = dict(zip(("size", "mtime_ns", "sha256"), row[1:4])) if row and row[4] == PARSER_VERSION else None
+        state, st, digest, data = file_state.check_file(os.path.join(root, path), entry)
+        if state == "same":
+            continue
+        if state == "touched":
+            db.execute("UPDATE sources SET size = ?, mtime_ns = ? WHERE id = ?",
+                       (st.st_size, st.st_mtime_ns, row[0]))
+            continue
+
+        source_id = row[0] if row else db.execute("INSERT INTO sources (path) VALUES (?)", (path,)).lastrowid
+        count = index_source(db, source_id, priority, data.decode('utf-8', errors='replace'))
+        db.execute("UPDATE sources SET priority = ?, size = ?, mtime_ns = ?, sha256 = ?, parser = ? WHERE id = ?",
+                   (priority, st.st_size, st.st_mtime_ns, digest, PARSER_VERSION, source_id))
+        if verbose:
+            print(f"Indexing: {path} ({count} entries)", file=sys.stderr)
+        changed += 1
+
+    # Files that disappeared
+    for path, row in known.items():
+        db.execute("DELETE FROM files WHERE entry IN (SELECT id FROM entries WHERE source = ?)", (row[0],))
+        db.execute("DELETE FROM entries WHERE source = ?", (row[0],))
+        db.execute("DELETE FROM sources WHERE id = ?", (row[0],))
+        changed += 1
+
+    db.commit()
+    return changed
+
+def month_filter(month):
+    # SQL condition + params for an optional YYYY-MM (or YYYY) prefix
+    if not month:
+        return "1", ()
+    return "date LIKE ?", (month + "%",)
+
+def entries_per_day(db, month=None):
+    where, params = month_filter(month)
+    return db.execute(f"SELECT date, COUNT(*) FROM diary WHERE {where} GROUP BY date ORDER BY date",
+                      params).fetchall()
+
+def top_articles(db, month=None, limit=10):
+    where, params = month_filter(month)
+    return db.execute(f"""
+        SELECT f.article, COUNT(DISTINCT d.id) AS n FROM diary d JOIN files f ON f.entry = d.id
+        WHERE f.article IS NOT NULL AND {where}
+        GROUP BY f.article ORDER BY n DESC, f.article LIMIT ?""", params + (limit,)).fetchall()
+
+def search(db, term, category=None, month=None):
+    where, params = month_filter(month)
+    if category:
+        where += " AND category = ?"
+        params += (category,)
+    like = "%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+    return db.execute(f"""
+        SELECT date, time, icon, message, body FROM diary
+        WHERE (message LIKE ? ESCAPE '\\' OR body LIKE ? ESCAPE '\\') AND {where}
+        ORDER BY date DESC, time DESC""", (like, like) + params).fetchall()
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the work diary (diary/*.md and the v1 archive).")
+    parser.add_argument("--index", default=INDEX_PATH, help="index file (sqlite)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    per_day = sub.add_parser("per-day", help="entries per day")
+    per_day.add_argument("--month", help="YYYY-MM (or YYYY); default: everything")
+    top = sub.add_parser("top-articles", help="articles touched by the most entries")
+    top.add_argument("--month", help="YYYY-MM (or YYYY); default: this month")
+    top.add_argument("--all", action="store_true", help="whole diary instead of one month")
+    top.add_argument("-n", type=int, default=10)
+    find = sub.add_parser("search", help="entries mentioning TERM, newest first")
+    find.add_argument("term")
+    find.add_argument("--category", choices=("content", "system", "other"))
+    find.add_argument("--month", help="YYYY-MM (or YYYY)")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    db = open_index(args.index)
+    update_index(db, verbose=True)
+
+    if args.command == "per-day":
+        rows = entries_per_day(db, args.month)
+        for date, count in rows:
+            print(f"{date}  {count:>4}  {'▇' * min(count, 60)}")
+        print(f"📅 {len(rows)} days, {sum(c for _, c in rows)} entries")
+    elif args.command == "top-articles":
+        month = None if args.all else (args.month or datetime.date.today().strftime("%Y-%m"))
+        rows = top_articles(db, month, args.n)
+        if not rows:
+            print(f"ไม่พบบทความที่ถูกแก้ไขใน {month}" if month else "ไม่พบบทความที่ถูกแก้ไข")
+        for article, count in rows:
+            print(f"{count:>4}  {article}")
+    else:
+        rows = search(db, args.term, args.category, args.month)
+        for date, time_str, icon, message, body in rows:
+            print(f"[{date} {time_str}] {icon} {message}".replace("  ", " "))
+        print(f"🔎 {len(rows)} entries mention \"{args.term}\"")
+    print(f"({(time.perf_counter() - started) * 1000:.1f} ms)", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
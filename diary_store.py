@@ -0,0 +1,372 @@
+import os
+import re
+import glob
+import json
+import datetime
+
+import file_state
+
+# The diary is sharded by month: diary/YYYY-MM.md is rendered one day
+# section at a time from diary/YYYY-MM.jsonl, an append-only record of
+# everything update_diary.py logs. Past months are never touched again.
+# git_diary.md is a small generated index page linking the months.
+DIARY_DIR = "diary"
+INDEX_PAGE = "git_diary.md"
+ARCHIVE_PAGE = "git_diary_v1_archive.md"
+LEGACY_STORE = "git_diary.jsonl"
+# Byte offsets of day headers (diary) and of each day's records (store).
+# Pure cache: rebuilt by a scan whenever a file changed behind our back.
+CACHE_DIR = os.path.join(".cache", "diary_index")
+
+DIARY_TITLE = "🧠 บันทึกการพัฒนาด้วย AI (AI Development Log)"
+DATE_HEADER = "## 📅"
+LOG_HEADER = "### 📝 บันทึกการปฏิบัติงาน (Operations Log)"
+NEXT_STEPS_HEADER = "### ⏭️ ก้าวต่อไป (Next Steps)"
+DEFAULT_SUMMARY = "**🤖 สรุปภาพรวมประจำวัน:**\n(รอสรุป...)\n\n"
+DEFAULT_TAIL = f"\n{NEXT_STEPS_HEADER}\n- [ ] ...\n\n"
+
+THAI_MONTHS = [
+    "มกราคม", "กุมภาพันธ์", "มีนาคม", "เมษายน", "พฤษภาคม", "มิถุนายน",
+    "กรกฎาคม", "สิงหาคม", "กันยายน", "ตุลาคม", "พฤศจิกายน", "ธันวาคม"
+]
+THAI_DATE = re.compile(r'(\d{1,2}) (' + '|'.join(THAI_MONTHS) + r') (\d{4})')
+
+def shard_file(month):
+    return os.path.join(DIARY_DIR, f"{month}.md")
+
+def store_file(month):
+    return os.path.join(DIARY_DIR, f"{month}.jsonl")
+
+def month_title(month):
+    year, number = month.split("-")
+    return f"{THAI_MONTHS[int(number) - 1]} {year}"
+
+def header_month(header):
+    # "## 📅 13 ธันวาคม 2025" -> "2025-12"
+    match = THAI_DATE.search(header)
+    if not match:
+        return None
+    return f"{match.group(3)}-{THAI_MONTHS.index(match.group(2)) + 1:02d}"
+
+def list_months():
+    """Months that have a shard, newest first."""
+    names = glob.glob(os.path.join(DIARY_DIR, "[0-9][0-9][0-9][0-9]-[0-9][0-9].md"))
+    return sorted((os.path.basename(n)[:-len(".md")] for n in names), reverse=True)
+
+def latest_shard():
+    months = list_months()
+    return shard_file(months[0]) if months else None
+
+def file_key(path):
+    if not os.path.exists(path):
+        return None
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+def load_index(month):
+    try:
+        with open(os.path.join(CACHE_DIR, f"{month}.json"), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"month": month}
+
+def save_index(index):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = os.path.join(CACHE_DIR, f"{index['month']}.json")
+    file_state.atomic_write_json(path, index)
+
+# ---------------------------------------------------------------------------
+# Store (JSONL)
+
+def scan_store(path):
+    # date -> [first byte offset, end offset] of that day's records
+    days = {}
+    offset = 0
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            for line in f:
+                if line.strip():
+                    date = json.loads(line)["date"]
+                    days.setdefault(date, [offset, offset])[1] = offset + len(line)
+                offset += len(line)
+    return days
+
+def store_days(index):
+    path = store_file(index["month"])
+    if "store_days" not in index or index.get("store_key") != file_key(path):
+        index["store_days"] = scan_store(path)
+        index["store_key"] = file_key(path)
+    return index["store_days"]
+
+def append_record(record, index):
+    """Append one record; constant time regardless of diary history."""
+    path = store_file(index["month"])
+    days = store_days(index)
+    line = (json.dumps(record, ensure_ascii=False) + "\n").encode('utf-8')
+    os.makedirs(DIARY_DIR, exist_ok=True)
+    with open(path, 'ab') as f:
+        offset = f.tell()
+        f.write(line)
+    span = days.setdefault(record["date"], [offset, offset])
+    span[1] = offset + len(line)
+    index["store_key"] = file_key(path)
+    save_index(index)
+
+def day_records(date, index):
+    span = store_days(index).get(date)
+    if not span:
+        return []
+    with open(store_file(index["month"]), 'rb') as f:
+        f.seek(span[0])
+        chunk = f.read(span[1] - span[0])
+    records = [json.loads(line) for line in chunk.splitlines() if line.strip()]
+    # Other days' records may sit in between (e.g. a late summary)
+    return [r for r in records if r["date"] == date]
+
+# ---------------------------------------------------------------------------
+# Diary (Markdown)
+
+def scan_diary(diary_file):
+    """Byte offsets of the title end and of every day header line."""
+    with open(diary_file, 'rb') as f:
+        data = f.read()
+    header = DATE_HEADER.encode('utf-8')
+    starts = [0] if data.startswith(header) else []
+    pos = data.find(b"\n" + header)
+    while pos != -1:
+        starts.append(pos + 1)
+        pos = data.find(b"\n" + header, pos + 1)
+
+    days = []
+    for start in starts:
+        end_of_line = data.find(b"\n", start)
+        if end_of_line == -1:
+            end_of_line = len(data)
+        days.append([data[start:end_of_line].decode('utf-8').strip(), start])
+
+    # New days go right after the "# " title (and the blank line after it)
+    top = 0
+    if data.startswith(b"# "):
+        top = data.find(b"\n") + 1 if b"\n" in data else len(data)
+        if data[top:top + 1] == b"\n":
+            top += 1
+    return {"top": top, "days": days, "size": len(data)}
+
+def diary_layout(diary_file, index):
+    if "diary" not in index or index.get("diary_key") != file_key(diary_file):
+        index["diary"] = scan_diary(diary_file)
+        index["diary_key"] = file_key(diary_file)
+    return index["diary"]
+
+def find_section(layout, header):
+    # [start, end) of the section that begins with this header line
+    for i, (text, start) in enumerate(layout["days"]):
+        if text == header:
+            end = layout["days"][i + 1][1] if i + 1 < len(layout["days"]) else layout["size"]
+            return start, end
+    return None
+
+def read_head_days(diary_file, count, chunk_size=1 << 16):
+    """Text of the first `count` day sections, without reading the rest.
+
+    Uses the cached offsets when they are current; otherwise reads the
+    head of the file in chunks until one more day header shows up.
+    Returns (text, number of days found).
+    """
+    month = os.path.basename(diary_file)[:-len(".md")]
+    index = load_index(month)
+    if "diary" in index and index.get("diary_key") == file_key(diary_file):
+        days = index["diary"]["days"]
+        if not days:
+            return "", 0
+        start = days[0][1]
+        end = days[count][1] if count < len(days) else index["diary"]["size"]
+        with open(diary_file, 'rb') as f:
+            f.seek(start)
+            return f.read(end - start).decode('utf-8'), min(count, len(days))
+
+    marker = b"\n" + DATE_HEADER.encode('utf-8')
+    data = b""
+    starts = []
+    search_from = 0
+    with open(diary_file, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if data == b"" and chunk.startswith(marker[1:]):
+                starts.append(0)
+            data += chunk
+            pos = data.find(marker, search_from)
+            while pos != -1:
+                starts.append(pos + 1)
+                pos = data.find(marker, pos + 1)
+            # A marker may straddle the chunk boundary
+            search_from = max(0, len(data) - len(marker))
+            if len(starts) > count or not chunk:
+                break
+    if not starts:
+        return "", 0
+    end = starts[count] if len(starts) > count else len(data)
+    return data[starts[0]:end].decode('utf-8'), min(count, len(starts))
+
+def split_section(text):
+    """Split a day section into (summary, log entries, tail) text."""
+    body = text.split("\n", 1)[1] if "\n" in text else ""
+    summary, sep, rest = body.partition(LOG_HEADER + "\n")
+    if not sep:
+        return body, "", ""
+    log, sep, tail = rest.partition("\n" + NEXT_STEPS_HEADER)
+    return summary, log, sep + tail
+
+def render_day(header, records):
+    # Import record = the section as it was on disk when it was imported;
+    # entries stored before it are already part of its log
+    summary, log, tail = DEFAULT_SUMMARY, "", DEFAULT_TAIL
+    entries = []
+    for record in records:
+        if record["type"] == "import":
+            summary, log, tail = record["summary"], record["log"], record["tail"]
+            entries = []
+        elif record["type"] == "summary":
+            summary = record["markdown"]
+        elif record["type"] == "entry":
+            entries.append(record["markdown"])
+    # Newest entry first (LIFO), above anything imported
+    entries.reverse()
+    return f"{header}\n{summary}{LOG_HEADER}\n" + "".join(entries) + log + tail
+
+def import_day(diary_file, date, header, index):
+    """Make sure the store holds a day's section as it is on disk before
+    that section is rendered again.
+
+    A section written before the store existed, or edited by hand since
+    it was last rendered (e.g. the Next Steps filled in), is kept
+    verbatim as an "import" record, so re-rendering never undoes it.
+    """
+    if not os.path.exists(diary_file):
+        return
+    span = find_section(diary_layout(diary_file, index), header)
+    if span is None:
+        return
+    with open(diary_file, 'rb') as f:
+        f.seek(span[0])
+        text = f.read(span[1] - span[0]).decode('utf-8')
+    records = day_records(date, index)
+    if records and text == render_day(header, records):
+        return
+    summary, log, tail = split_section(text)
+    append_record({"date": date, "type": "import", "summary": summary, "log": log, "tail": tail}, index)
+
+def add_record(date, header, record):
+    """Store a record and re-render only that day's section of its month."""
+    month = date[:7]
+    diary_file = shard_file(month)
+    index = load_index(month)
+    new_month = not os.path.exists(diary_file)
+    if new_month:
+        # Rollover: start this month's shard
+        os.makedirs(DIARY_DIR, exist_ok=True)
+        with open(diary_file, 'w', encoding='utf-8') as f:
+            f.write(f"# {DIARY_TITLE}: {month_title(month)}\n\n")
+
+    import_day(diary_file, date, header, index)
+    append_record(dict(record, date=date), index)
+
+    section = render_day(header, day_records(date, index)).encode('utf-8')
+    layout = diary_layout(diary_file, index)
+    span = find_section(layout, header) or (layout["top"], layout["top"])
+    with open(diary_file, 'rb') as f:
+        data_head = f.read(span[0])
+        f.seek(span[1])
+        data_tail = f.read()
+
+    # Prefix and suffix are copied as raw bytes, never parsed
+    with open(diary_file, 'wb') as f:
+        f.write(data_head + section + data_tail)
+
+    # Shift the cached offsets instead of rescanning
+    start, old_end = span
+    new_size = len(data_head) + len(section) + len(data_tail)
+    delta = new_size - layout["size"]
+    days = [[t, s] for t, s in layout["days"] if s < start]
+    days.append([header, start])
+    days += [[t, s + delta] for t, s in layout["days"] if s >= old_end]
+    index["diary"] = {"top": layout["top"], "days": days, "size": new_size}
+    index["diary_key"] = file_key(diary_file)
+    save_index(index)
+
+    if new_month:
+        write_index_page()
+
+def write_index_page(intro=""):
+    """Regenerate git_diary.md: a short list of the monthly shards."""
+    lines = [f"# {DIARY_TITLE}\n", "\n"]
+    if intro:
+        lines += [intro.rstrip() + "\n", "\n"]
+    lines += [
+        f"> ไฟล์นี้สร้างอัตโนมัติโดย `update_diary.py` บันทึกประจำวันแยกเก็บรายเดือนในโฟลเดอร์ `{DIARY_DIR}/`\n",
+        "\n",
+        "## 🗂️ สารบัญรายเดือน (Monthly Index)\n",
+    ]
+    for month in list_months():
+        lines.append(f"*   [{month_title(month)}]({DIARY_DIR}/{month}.md)\n")
+    if os.path.exists(ARCHIVE_PAGE):
+        lines.append(f"*   [📦 บันทึกเวอร์ชันแรก (v1 Archive)]({ARCHIVE_PAGE})\n")
+    with open(INDEX_PAGE, 'w', encoding='utf-8') as f:
+        f.writelines(lines)
+
+def migrate_legacy():
+    """Split a single-file git_diary.md (and git_diary.jsonl) into month shards.
+
+    Runs once: afterwards git_diary.md is the generated index page and has
+    no day sections left. Days whose header has no recognisable date stay
+    with the month above them (the first month, for days at the top); if
+    no header has a date they go to the current month.
+    """
+    moved = False
+    if os.path.exists(INDEX_PAGE):
+        layout = scan_diary(INDEX_PAGE)
+        if layout["days"]:
+            with open(INDEX_PAGE, 'rb') as f:
+                data = f.read()
+            first = layout["days"][0][1]
+            intro = data[layout["top"]:first].decode('utf-8').strip()
+
+            shards = {}
+            month = None
+            undated = []
+            bounds = [start for _, start in layout["days"]] + [len(data)]
+            for (header, start), end in zip(layout["days"], bounds[1:]):
+                month = header_month(header) or month
+                if month is None:
+                    # Before any dated day: goes with the first month found
+                    undated.append(data[start:end])
+                    continue
+                shards.setdefault(month, []).extend(undated + [data[start:end]])
+                undated = []
+            if undated:
+                # No recognisable date at all: they go to this month's shard
+                # (left in git_diary.md they would be migrated again next run)
+                shards.setdefault(datetime.date.today().strftime("%Y-%m"), []).extend(undated)
+
+            os.makedirs(DIARY_DIR, exist_ok=True)
+            for month, sections in shards.items():
+                path = shard_file(month)
+                if not os.path.exists(path):
+                    with open(path, 'wb') as f:
+                        f.write(f"# {DIARY_TITLE}: {month_title(month)}\n\n".encode('utf-8'))
+                # Older days go below anything already in the shard
+                with open(path, 'ab') as f:
+                    f.write(b"".join(sections))
+            write_index_page(intro)
+            moved = True
+
+    if os.path.exists(LEGACY_STORE):
+        with open(LEGACY_STORE, 'rb') as f:
+            lines = [line for line in f if line.strip()]
+        os.makedirs(DIARY_DIR, exist_ok=True)
+        for line in lines:
+            with open(store_file(json.loads(line)["date"][:7]), 'ab') as f:
+                f.write(line)
+        os.remove(LEGACY_STORE)
+        moved = True
+    return moved
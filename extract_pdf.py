@@ -1,30 +1,299 @@
-
 import sys
-try:
-    from pypdf import PdfReader
-except ImportError:
+import os
+import argparse
+import sqlite3
+import re
+import importlib
+import importlib.util
+
+import file_state
+
+# The PDF library is only imported once a PDF actually has to be parsed,
+# so runs served from the page cache never load it. PyPDF2 has the same
+# PdfReader API and is used if pypdf is missing.
+PDF_LIBRARIES = ("pypdf", "PyPDF2")
+VERSION_LINE = re.compile(r'^__version__\s*=\s*["\']([^"\']+)["\']', re.M)
+_pdf_library = None
+
+# Extracted text per page, keyed by PDF content hash + extractor version
+CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "references", ".cache", "pages.sqlite3")
+
+def pdf_library():
+    """(name, version) of the PDF library, found without importing it."""
+    global _pdf_library
+    if _pdf_library is None:
+        for name in PDF_LIBRARIES:
+            spec = importlib.util.find_spec(name)
+            if spec is None or not spec.origin:
+                continue
+            version = None
+            try:
+                with open(os.path.join(os.path.dirname(spec.origin), "_version.py"), 'r', encoding='utf-8') as f:
+                    match = VERSION_LINE.search(f.read())
+                version = match and match.group(1)
+            except OSError:
+                pass
+            if not version:
+                version = importlib.import_module(name).__version__
+            _pdf_library = (name, version)
+            break
+        else:
+            raise ImportError("pypdf or PyPDF2 not installed.")
+    return _pdf_library
+
+def extractor():
+    # Cache key for extracted text, e.g. "pypdf-6.1.0"
+    return "-".join(pdf_library())
+
+def open_pdf(filepath):
+    return importlib.import_module(pdf_library()[0]).PdfReader(filepath)
+
+def parse_page_range(spec):
+    """'3-10' -> (3, 10), '5' -> (5, 5), '7-' -> (7, None). Pages are 1-based."""
+    start, sep, end = spec.partition('-')
     try:
-        import PyPDF2 as PdfReader # Fallback
-    except ImportError:
-        print("Error: pypdf or PyPDF2 not installed.")
-        sys.exit(1)
+        first = int(start) if start else 1
+        last = int(end) if end else None
+        if not sep:
+            last = first
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid page range: {spec!r}")
+    if first < 1 or (last is not None and last < first):
+        raise argparse.ArgumentTypeError(f"invalid page range: {spec!r}")
+    return first, last
+
+def open_cache(path=CACHE_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    cache = sqlite3.connect(path)
+    cache.executescript("""
+        CREATE TABLE IF NOT EXISTS files (
+            path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, sha256 TEXT);
+        CREATE TABLE IF NOT EXISTS documents (
+            sha256 TEXT, extractor TEXT, pages INTEGER,
+            PRIMARY KEY (sha256, extractor));
+        CREATE TABLE IF NOT EXISTS pages (
+            sha256 TEXT, extractor TEXT, page INTEGER, text TEXT,
+            PRIMARY KEY (sha256, extractor, page));
+    """)
+    return cache
+
+def file_sha256(cache, filepath):
+    # Hashing a multi-MB PDF is only needed when its stat changes
+    path = os.path.abspath(filepath)
+    row = cache.execute("SELECT size, mtime_ns, sha256 FROM files WHERE path = ?", (path,)).fetchone()
+    entry = dict(zip(("size", "mtime_ns", "sha256"), row)) if row else None
+    state, st, digest, _ = file_state.check_file(path, entry, read=False)
+    if state == "same":
+        return digest
+    cache.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)",
+                  (path, st.st_size, st.st_mtime_ns, digest))
+    cache.commit()
+    return digest
+
+def cached_page_count(cache, digest, filepath):
+    row = cache.execute("SELECT pages FROM documents WHERE sha256 = ? AND extractor = ?",
+                        (digest, extractor())).fetchone()
+    if row:
+        return row[0]
+    count = len(open_pdf(filepath).pages)
+    cache.execute("INSERT OR REPLACE INTO documents VALUES (?, ?, ?)", (digest, extractor(), count))
+    cache.commit()
+    return count
+
+def cached_page(cache, digest, number):
+    row = cache.execute("SELECT text FROM pages WHERE sha256 = ? AND extractor = ? AND page = ?",
+                        (digest, extractor(), number)).fetchone()
+    return row[0] if row else None
+
+def cached_page_numbers(cache, digest, first, last):
+    rows = cache.execute("SELECT page FROM pages WHERE sha256 = ? AND extractor = ? AND page BETWEEN ? AND ?",
+                         (digest, extractor(), first, last))
+    return {row[0] for row in rows}
+
+def store_pages(cache, digest, pages):
+    cache.executemany("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?)",
+                      [(digest, extractor(), number, text) for number, text in pages])
+    cache.commit()
+
+def iter_pages(filepath, first=1, last=None, cache=None):
+    """Yield (page_number, text) one page at a time, in page order.
+
+    With a cache, pages already extracted are read back from it and the
+    PDF is only parsed if some requested page is missing.
+    """
+    if cache is None:
+        reader = open_pdf(filepath)
+        count = len(reader.pages)
+    else:
+        reader = None
+        digest = file_sha256(cache, filepath)
+        count = cached_page_count(cache, digest, filepath)
+    if last is None or last > count:
+        last = count
+
+    for number in range(first, last + 1):
+        text = None if cache is None else cached_page(cache, digest, number)
+        if text is None:
+            if reader is None:
+                reader = open_pdf(filepath)
+            text = reader.pages[number - 1].extract_text() or ""
+            if cache is not None:
+                store_pages(cache, digest, [(number, text)])
+        yield number, text
+
+def extract_range(task):
+    """Worker: text of pages first..last of one file, as a list."""
+    filepath, first, last = task
+    return [text for _, text in iter_pages(filepath, first, last)]
+
+def split_ranges(filepath, first, last, chunk_size, cache=None):
+    """Cut one file's page range into (start, end, cached) segments.
+
+    Pages already in the cache form their own segments; the rest are cut
+    into chunks of at most chunk_size pages for the pool.
+    """
+    if cache is None:
+        digest = None
+        count = len(open_pdf(filepath).pages)
+    else:
+        digest = file_sha256(cache, filepath)
+        count = cached_page_count(cache, digest, filepath)
+    if last is None or last > count:
+        last = count
+    hits = set() if cache is None else cached_page_numbers(cache, digest, first, last)
+
+    segments = []
+    start = first
+    while start <= last:
+        cached = start in hits
+        end = start
+        while (end + 1 <= last and (end + 1 in hits) == cached
+               and (cached or end + 1 - start < chunk_size)):
+            end += 1
+        segments.append((start, end, cached))
+        start = end + 1
+    return digest, segments
+
+def iter_files_parallel(filepaths, jobs, first=1, last=None, chunk_size=8, cache=None):
+    """Yield (filepath, page_number, text) for many PDFs using a process pool.
+
+    Large files are split into page chunks so one long PDF doesn't keep a
+    single worker busy. Results are yielded in file order, then page order.
+    Errors are yielded as (filepath, None, exception).
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        plan = []
+        for filepath in filepaths:
+            try:
+                digest, segments = split_ranges(filepath, first, last, chunk_size, cache)
+                chunks = [(start, end, None if cached else pool.submit(extract_range, (filepath, start, end)))
+                          for start, end, cached in segments]
+            except Exception as e:
+                digest, chunks = None, e
+            plan.append((filepath, digest, chunks))
+
+        for filepath, digest, chunks in plan:
+            if isinstance(chunks, Exception):
+                yield filepath, None, chunks
+                continue
+            try:
+                for start, end, future in chunks:
+                    if future is None:
+                        for number in range(start, end + 1):
+                            yield filepath, number, cached_page(cache, digest, number)
+                        continue
+                    pages = list(enumerate(future.result(), start))
+                    if cache is not None:
+                        store_pages(cache, digest, pages)
+                    for number, text in pages:
+                        yield filepath, number, text
+            except Exception as e:
+                yield filepath, None, e
 
 def extract_text(filepath):
     try:
-        reader = PdfReader(filepath)
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text() + "\n"
-        return text
+        return "".join(text + "\n" for _, text in iter_pages(filepath))
     except Exception as e:
         print(f"Error reading PDF: {e}")
         return None
 
-if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python3 extract_pdf.py <pdf_file>")
+def iter_files_serial(filepaths, first=1, last=None, cache=None):
+    # Same contract as iter_files_parallel, one page at a time
+    for filepath in filepaths:
+        try:
+            for number, text in iter_pages(filepath, first, last, cache):
+                yield filepath, number, text
+        except Exception as e:
+            yield filepath, None, e
+
+def output_path(output_dir, filepath):
+    # Same naming as the existing references/*.pdf.txt files
+    return os.path.join(output_dir, os.path.basename(filepath) + ".txt")
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract text from PDFs, streaming page by page.")
+    parser.add_argument("pdf_files", nargs="+", metavar="pdf_file")
+    parser.add_argument("--pages", type=parse_page_range, default=(1, None),
+                        help="page range to extract, e.g. 3-10, 5 or 7- (1-based)")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="worker processes; large files are split into page chunks (0 = one per CPU)")
+    parser.add_argument("-o", "--output-dir",
+                        help="write <name>.pdf.txt per file into this folder instead of stdout")
+    parser.add_argument("--cache", default=CACHE_PATH,
+                        help="page text cache (sqlite), keyed by PDF SHA-256 and pypdf version")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="always re-parse the PDFs and leave the cache untouched")
+    args = parser.parse_args()
+
+    try:
+        pdf_library()
+    except ImportError as e:
+        print(f"Error: {e}")
         sys.exit(1)
-    
-    content = extract_text(sys.argv[1])
-    if content:
-        print(content)
+
+    first, last = args.pages
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    many = len(args.pdf_files) > 1
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    cache = None if args.no_cache else open_cache(args.cache)
+
+    if jobs > 1:
+        results = iter_files_parallel(args.pdf_files, jobs, first, last, cache=cache)
+    else:
+        results = iter_files_serial(args.pdf_files, first, last, cache)
+
+    failed = False
+    current = None
+    out = sys.stdout
+    try:
+        for filepath, number, text in results:
+            if number is None:
+                print(f"Error reading PDF {filepath}: {text}", file=sys.stderr)
+                failed = True
+                continue
+            if filepath != current:
+                current = filepath
+                if args.output_dir:
+                    if out is not sys.stdout:
+                        out.close()
+                    out = open(output_path(args.output_dir, filepath), 'w', encoding='utf-8')
+                    print(f"Extracting: {filepath} -> {out.name}", file=sys.stderr)
+                elif many:
+                    out.write(f"===== {filepath} =====\n")
+            out.write(text + "\n")
+            out.flush()
+    except BrokenPipeError:
+        # e.g. piped into head
+        sys.stderr.close()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
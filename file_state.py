@@ -0,0 +1,56 @@
+import os
+import json
+import hashlib
+
+# Shared by every cache in the repo: the stat-then-hash check that decides
+# whether a file needs re-reading, and atomic writes for the cache files.
+
+CHUNK = 1 << 20
+
+def sha256_file(path):
+    # Streams the file, so multi-MB PDFs and audio are never held in memory
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def check_file(path, entry, read=True):
+    """Compare a file with its cached entry ({"size", "mtime_ns", "sha256"}
+    or None), cheapest test first. Returns (state, stat, sha256, data):
+
+      "same"     size and mtime match; nothing was read (sha256 is the
+                 cached one, data is None)
+      "touched"  the stat moved but the content hash didn't: only the
+                 cached size and mtime need refreshing
+      "changed"  new or edited file
+
+    data is the file's bytes whenever it was read; with read=False the
+    file is only hashed (streamed) and data is always None.
+    """
+    st = os.stat(path)
+    if entry and entry.get("size") == st.st_size and entry.get("mtime_ns") == st.st_mtime_ns:
+        return "same", st, entry.get("sha256"), None
+    if read:
+        with open(path, 'rb') as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()
+    else:
+        data = None
+        digest = sha256_file(path)
+    state = "touched" if entry and entry.get("sha256") == digest else "changed"
+    return state, st, digest, data
+
+def atomic_write(path, data):
+    """Replace path with data (bytes or str) in one step, so a crash or a
+    concurrent reader never sees a half-written file."""
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def atomic_write_json(path, obj, **options):
+    # options go to json.dumps (indent, sort_keys, ...); non-ASCII kept as is
+    atomic_write(path, json.dumps(obj, ensure_ascii=False, **options))
@@ -1,44 +1,46 @@
-import markdown
 import os
 import glob
+import hashlib
+import json
+import argparse
+import time
+import textwrap
+import re
+import html
+import fnmatch
+from collections import Counter
+import ppp_trace
+import file_state
 
 # Premium CSS Template
-HTML_TEMPLATE = """
-<!DOCTYPE html>
-<html lang="th">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{title}</title>
-    <link href="https://fonts.googleapis.com/css2?family=Sarabun:wght@300;400;500;700&display=swap" rel="stylesheet">
-    <style>
-        :root {{
+PAGE_CSS = """
+        :root {
             --primary-color: #2c3e50;
             --accent-color: #c0392b;
             --text-color: #333;
             --bg-color: #f8f9fa;
             --paper-color: #ffffff;
-        }}
+        }
         
-        body {{
+        body {
             font-family: 'Sarabun', sans-serif;
             line-height: 1.8;
             color: var(--text-color);
             background-color: var(--bg-color);
             margin: 0;
             padding: 40px 20px;
-        }}
+        }
 
-        .container {{
+        .container {
             max-width: 210mm; /* A4 width */
             margin: 0 auto;
             background-color: var(--paper-color);
             padding: 25mm 25mm; /* A4 margins */
             box-shadow: 0 4px 6px rgba(0,0,0,0.05);
             border-radius: 4px;
-        }}
+        }
 
-        h1 {{
+        h1 {
             color: var(--primary-color);
             font-size: 24pt;
             font-weight: 700;
@@ -46,108 +48,120 @@ HTML_TEMPLATE = """
             margin-bottom: 2em;
             border-bottom: 2px solid var(--primary-color);
             padding-bottom: 15px;
-        }}
+        }
 
-        h2 {{
+        h2 {
             color: var(--primary-color);
             font-size: 18pt;
             font-weight: 700;
             margin-top: 1.5em;
             border-left: 5px solid var(--primary-color);
             padding-left: 10px;
-        }}
+        }
 
-        h3 {{
+        h3 {
             color: var(--text-color);
             font-size: 16pt;
             font-weight: 700;
             margin-top: 1.2em;
-        }}
+        }
 
-        p {{
+        p {
             margin-bottom: 1em;
             text-align: justify;
-        }}
+        }
 
-        ul, ol {{
+        ul, ol {
             margin-bottom: 1em;
             padding-left: 40px;
-        }}
+        }
 
-        li {{
+        li {
             margin-bottom: 0.5em;
-        }}
+        }
 
-        blockquote {{
+        blockquote {
             background-color: #f1f8ff;
             border-left: 5px solid #0366d6;
             margin: 1.5em 0;
             padding: 15px 20px;
             font-style: italic;
             color: #555;
-        }}
+        }
 
-        a {{
+        a {
             color: var(--accent-color);
             text-decoration: none;
             transition: all 0.2s ease;
-        }}
+        }
 
-        a:hover {{
+        a:hover {
             color: #a93226;
             text-decoration: underline;
-        }}
+        }
 
-        hr {{
+        hr {
             border: 0;
             height: 1px;
             background: #e0e0e0;
             margin: 3em 0;
-        }}
+        }
 
-        code {{
+        code {
             background-color: #f6f8fa;
             padding: 0.2em 0.4em;
             border-radius: 3px;
             font-family: monospace;
             font-size: 0.9em;
-        }}
+        }
 
-        sup {{
+        sup {
             color: var(--accent-color);
             font-weight: bold;
-        }}
+        }
         
-        .footer {{
+        .footer {
             margin-top: 50px;
             text-align: center;
             font-size: 0.9em;
             color: #777;
             border-top: 1px solid #ddd;
             padding-top: 20px;
-        }}
+        }
 
-        @media print {{
-            body {{
+        @media print {
+            body {
                 background: none;
                 padding: 0;
-            }}
-            .container {{
+            }
+            .container {
                 box-shadow: none;
                 margin: 0;
                 padding: 0;
                 width: 100%;
                 max-width: 100%;
-            }}
-            a {{
+            }
+            a {
                 text-decoration: none;
                 color: black;
-            }}
-            .no-print {{
+            }
+            .no-print {
                 display: none;
-            }}
-        }}
-    </style>
+            }
+        }
+"""
+
+# Page skeleton; {style} is either an inline <style> block or a <link>
+# to the shared stylesheet (see --css)
+HTML_TEMPLATE = """
+<!DOCTYPE html>
+<html lang="th">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{title}</title>
+    <link href="https://fonts.googleapis.com/css2?family=Sarabun:wght@300;400;500;700&display=swap" rel="stylesheet">
+    {style}
 </head>
 <body>
     <div class="container">
@@ -163,7 +177,656 @@ HTML_TEMPLATE = """
 
 from datetime import datetime
 
-def generate_html():
+MARKDOWN_EXTENSIONS = ['tables', 'fenced_code']
+MANIFEST_NAME = ".build-manifest.json"
+BLOCK_CACHE_NAME = ".block-cache.json"
+# Articles left out of the build (fnmatch patterns on the file name)
+SKIP_PATTERNS = ("*_backup.md",)
+FOOTER_MARKER = '<div class="footer">'
+
+ASSETS_DIR = "assets"
+CSS_MODES = ("inline", "external")
+TEMPLATE_FIELDS = ("title", "content", "timestamp")
+
+def inline_style():
+    return "<style>" + PAGE_CSS + "    </style>"
+
+def stylesheet_name():
+    # Named by content hash so browsers can cache it indefinitely
+    return f"style.{sha256_hex(PAGE_CSS)[:12]}.css"
+
+def stylesheet_link(name):
+    return f'<link rel="stylesheet" href="{ASSETS_DIR}/{name}">'
+
+def compile_template(template, style):
+    """Split a page template into the static bytes around its fields.
+
+    str.format() re-parses the whole template on every call. Filling it
+    once with sentinels leaves a plain join per article.
+    """
+    sentinels = {name: f"\x00{name}\x00" for name in TEMPLATE_FIELDS}
+    rest = template.format(style=style, **sentinels)
+    chunks = []
+    for name in TEMPLATE_FIELDS:
+        before, rest = rest.split(sentinels[name], 1)
+        chunks.append(before.encode('utf-8'))
+    chunks.append(rest.encode('utf-8'))
+    return tuple(chunks)
+
+def fill_page(chunks, title, content, timestamp):
+    # Same result as HTML_TEMPLATE.format(...), as UTF-8 bytes
+    head, before_content, before_timestamp, tail = chunks
+    return b"".join((
+        head, title.encode('utf-8'),
+        before_content, content.encode('utf-8'),
+        before_timestamp, timestamp.encode('utf-8'),
+        tail,
+    ))
+
+# One converter per process; extensions are loaded once and the instance
+# is reset() between documents instead of being rebuilt. markdown itself
+# is imported on first use, so a build with nothing to convert skips it.
+_converter = None
+
+def convert_markdown(text):
+    global _converter
+    if _converter is None:
+        import markdown
+        _converter = markdown.Markdown(extensions=MARKDOWN_EXTENSIONS)
+    return _converter.reset().convert(text)
+
+FENCE_LINE = re.compile(r'^(`{3,}|~{3,})')
+HEADING_LINE = re.compile(r'^#{1,6}(\s|$)')
+# Raw HTML blocks and reference-style link definitions can reach across
+# headings, so documents using them are converted whole
+UNSPLITTABLE = re.compile(r'^<|^ {0,3}\[[^\]]+\]:', re.M)
+# Table rows and indented lines (list continuations, code) can swallow a
+# heading or the blocks after it, so no split follows them
+NO_SPLIT_AFTER = re.compile(r'^(\s|.*\|)')
+
+def split_blocks(text):
+    """Split markdown at ATX headings (outside fenced code) that follow a
+    blank line after ordinary paragraph text.
+
+    Each block then converts on its own to exactly its share of the whole
+    document, so the page is "\\n".join() of the converted blocks and
+    a block shared by several variants is converted once.
+    """
+    if UNSPLITTABLE.search(text):
+        return [text]
+    blocks, current, fence = [], [], None
+    last = None  # last non-blank line
+    for line in text.split('\n'):
+        match = FENCE_LINE.match(line)
+        if fence:
+            # Only the same fence, alone on its line, closes it
+            if line.rstrip(' ') == fence:
+                fence = None
+        elif match:
+            fence = match.group(1)
+        elif (HEADING_LINE.match(line) and last is not None and not current[-1].strip()
+                and not NO_SPLIT_AFTER.match(last)):
+            blocks.append('\n'.join(current))
+            current = []
+        current.append(line)
+        if line.strip():
+            last = line
+    if fence:
+        # An unclosed fence is not code at all to markdown: don't guess
+        return [text]
+    blocks.append('\n'.join(current))
+    return blocks
+
+def block_cache_key():
+    import markdown
+    return {"markdown": markdown.__version__, "extensions": MARKDOWN_EXTENSIONS}
+
+def load_block_cache(path):
+    # {sha256 of block markdown: converted html}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+        if cache.get("key") == block_cache_key():
+            return cache["blocks"]
+    except (OSError, ValueError, KeyError):
+        pass
+    return {}
+
+def save_block_cache(path, blocks):
+    file_state.atomic_write_json(path, {"key": block_cache_key(), "blocks": blocks}, sort_keys=True)
+
+def timed_convert(text):
+    started = time.perf_counter()
+    html_content = convert_markdown(text)
+    return html_content, time.perf_counter() - started
+
+def convert_blocks(texts, block_cache, jobs):
+    """Convert documents through the block cache.
+
+    Returns ([html per document], [block hashes per document], number of
+    blocks actually converted, [markdown seconds per document]). Blocks
+    seen in the cache or earlier in this batch are reused; their time is
+    charged to the first document that needed them.
+    """
+    hashes = []
+    pending = {}
+    for number, text in enumerate(texts):
+        doc = []
+        for block in split_blocks(text):
+            digest = sha256_hex(block)
+            if digest not in block_cache:
+                pending.setdefault(digest, (number, block))
+            doc.append(digest)
+        hashes.append(doc)
+
+    seconds = [0.0] * len(texts)
+    blocks = [block for _, block in pending.values()]
+    if sum(len(b) for b in blocks) < POOL_MIN_CHARS:
+        jobs = 1
+    results = map_tasks(timed_convert, blocks, jobs)
+    for (digest, (number, _)), (html_content, elapsed) in zip(pending.items(), results):
+        block_cache[digest] = html_content
+        seconds[number] += elapsed
+    pages = ["\n".join(h for h in (block_cache[d] for d in doc) if h) for doc in hashes]
+    return pages, hashes, len(pending), seconds
+
+def is_skipped(filename, patterns=SKIP_PATTERNS):
+    return any(fnmatch.fnmatch(filename, p) for p in patterns)
+
+def variant_families(filenames):
+    """Group articles into variant families by file name.
+
+    section.md, section_simple.md and section_executive.md form the
+    family "section": a variant is any article whose stem is another
+    article's stem plus "_suffix" (the shortest such stem wins).
+    """
+    stems = sorted(f[:-len('.md')] for f in filenames)
+    families = {}
+    for stem in stems:
+        family = next((s for s in stems if stem.startswith(s + "_")), stem)
+        families.setdefault(family, []).append(stem + ".md")
+    return families
+
+def sha256_hex(data):
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    return hashlib.sha256(data).hexdigest()
+
+def build_key(css, citations=False):
+    # Everything besides the article text that affects the rendered page.
+    # If any of it changes, every manifest entry is stale. An external
+    # stylesheet is tracked on its own ("stylesheet"), so CSS edits only
+    # swap the <link> in each page.
+    key = {
+        "template": sha256_hex(HTML_TEMPLATE),
+        "extensions": MARKDOWN_EXTENSIONS,
+        "css": css,
+        "citation_links": citations,
+    }
+    if css == "inline":
+        key["style"] = sha256_hex(PAGE_CSS)
+    return key
+
+def load_manifest(path, css="inline", citations=False):
+    key = build_key(css, citations)
+    empty = dict(key, files={})
+    if not os.path.exists(path):
+        return empty
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return empty
+    if any(manifest.get(k) != v for k, v in key.items()):
+        return empty
+    manifest.setdefault("files", {})
+    return manifest
+
+def save_manifest(path, manifest):
+    # Atomic, so an interrupted build never leaves a half-written manifest
+    file_state.atomic_write(path, json.dumps(manifest, ensure_ascii=False, indent=2, sort_keys=True) + "\n")
+
+def get_title(text):
+    # Get Title (assume first line header)
+    for line in text.split('\n'):
+        if line.startswith('# '):
+            return line.replace('# ', '').strip()
+    return "Document"
+
+def body_unchanged(output_path, new_body):
+    # Legacy Smart Update: compare against the page already on disk.
+    # Only used for files the manifest doesn't know about yet.
+    if not os.path.exists(output_path):
+        return False
+    with open(output_path, 'r', encoding='utf-8') as f:
+        old_full_html = f.read()
+
+    # Extract body from old file (everything before footer)
+    if FOOTER_MARKER not in old_full_html:
+        return False
+    old_body = old_full_html.split(FOOTER_MARKER)[0]
+
+    # Normalize (strip warnings, newlines might differ)
+    return old_body.strip() == new_body.strip()
+
+def render_article(task):
+    """Converted article -> full page.
+
+    Returns None when a page not yet tracked by the manifest turns out
+    to be unchanged on disk.
+    """
+    title, html_content, output_path, timestamp, compare, chunks = task
+
+    # Not in the manifest yet: fall back to comparing the page body
+    # WITHOUT timestamp, so adopting the manifest doesn't rewrite pages
+    if compare:
+        if body_unchanged(output_path, page_body(chunks, title, html_content)):
+            return None
+
+    # Fill Template with CURRENT Time
+    return fill_page(chunks, title, html_content, timestamp)
+
+def page_body(chunks, title, html_content):
+    # Page text up to the footer, i.e. everything the timestamp doesn't touch
+    head, before_content, before_timestamp, _ = (c.decode('utf-8') for c in chunks)
+    return head + title + before_content + html_content + before_timestamp.split(FOOTER_MARKER)[0]
+
+# Below this much pending markdown a serial convert beats starting worker
+# processes (each one re-imports markdown; ~1 ms per block in-process)
+POOL_MIN_CHARS = 512 * 1024
+
+def map_tasks(func, tasks, jobs):
+    # Results always come back in task order, whatever the job count
+    if jobs <= 1 or len(tasks) <= 1:
+        return [func(t) for t in tasks]
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=min(jobs, len(tasks))) as pool:
+        return list(pool.map(func, tasks))
+
+def write_stylesheet(output_dir):
+    # Emit the shared stylesheet once; returns its file name
+    assets_dir = os.path.join(output_dir, ASSETS_DIR)
+    os.makedirs(assets_dir, exist_ok=True)
+    name = stylesheet_name()
+    path = os.path.join(assets_dir, name)
+    if not os.path.exists(path):
+        print(f"Writing stylesheet: {ASSETS_DIR}/{name}")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(textwrap.dedent(PAGE_CSS).lstrip())
+    return name
+
+def restyle_page(path, old_name, new_name):
+    # CSS-only change: swap the <link> and keep the page (and its timestamp)
+    with open(path, 'rb') as f:
+        page = f.read()
+    old_link = stylesheet_link(old_name).encode('utf-8')
+    if old_link not in page:
+        return False
+    with open(path, 'wb') as f:
+        f.write(page.replace(old_link, stylesheet_link(new_name).encode('utf-8'), 1))
+    return True
+
+def remove_old_stylesheets(output_dir, keep):
+    assets_dir = os.path.join(output_dir, ASSETS_DIR)
+    for path in glob.glob(os.path.join(assets_dir, "style.*.css")):
+        if os.path.basename(path) != keep:
+            os.remove(path)
+
+SEARCH_DIR = "search"
+SEARCH_SHARDS = 16
+SEARCH_PAGE = "search.html"
+
+# Static search page. Index files are loaded as <script> tags (not fetch)
+# so searching also works when the pages are opened from disk (file://).
+# tokenize() and shardOf() must match search_index.tokenize / shard_of.
+SEARCH_PAGE_CONTENT = """<h1>ค้นหาบทความ</h1>
+<form id="search-form" class="no-print">
+    <input id="search-box" type="search" placeholder="เช่น เหตุสุดวิสัย หรือ มาตรา 102" style="width:100%;padding:10px;font:inherit;font-size:1.1em">
+</form>
+<p id="search-status"></p>
+<div id="search-results"></div>
+<script>
+var SEARCH = {index: null, shards: {}, docs: {}, waiting: {}};
+function SEARCH_INDEX(data) { SEARCH.index = data; done("index"); }
+function SEARCH_SHARD(n, data) { SEARCH.shards[n] = data; done("shard-" + n); }
+function SEARCH_DOC(id, data) { SEARCH.docs[id] = data; done("doc-" + id); }
+function done(key) { (SEARCH.waiting[key] || []).forEach(function (f) { f(); }); delete SEARCH.waiting[key]; }
+function load(key, src, loaded) {
+    if (loaded()) return Promise.resolve();
+    return new Promise(function (resolve) {
+        if (!SEARCH.waiting[key]) {
+            SEARCH.waiting[key] = [];
+            var s = document.createElement("script");
+            s.src = src;
+            s.onerror = function () { done(key); };
+            document.head.appendChild(s);
+        }
+        SEARCH.waiting[key].push(resolve);
+    });
+}
+function tokenize(text) {
+    var terms = [];
+    (text.match(/[\\u0e00-\\u0e7f]+|[0-9a-z]+/g) || []).forEach(function (run) {
+        if (/^[\\u0e00-\\u0e7f]+$/.test(run)) {
+            for (var i = 0; i < run.length - 1; i++) terms.push(run.slice(i, i + 2));
+        } else {
+            terms.push(run);
+        }
+    });
+    return terms;
+}
+function shardOf(term) {
+    var sum = 0;
+    for (var i = 0; i < term.length; i++) sum += term.charCodeAt(i);
+    return sum % SEARCH.index.shards;
+}
+function escapeHtml(s) {
+    return s.replace(/[&<>"]/g, function (c) { return {"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;"}[c]; });
+}
+function snippet(text, words) {
+    var lower = text.toLowerCase(), pos = -1, len = 0;
+    words.forEach(function (w) { var p = lower.indexOf(w); if (p >= 0 && (pos < 0 || p < pos)) { pos = p; len = w.length; } });
+    if (pos < 0) return escapeHtml(text.slice(0, 160));
+    var start = Math.max(0, pos - 60), end = Math.min(text.length, pos + len + 60);
+    return (start > 0 ? "…" : "") + escapeHtml(text.slice(start, pos)) + "<mark>" + escapeHtml(text.slice(pos, pos + len)) +
+        "</mark>" + escapeHtml(text.slice(pos + len, end)) + (end < text.length ? "…" : "");
+}
+function search(query) {
+    var words = query.toLowerCase().split(/\\s+/).filter(Boolean);
+    var terms = Array.from(new Set([].concat.apply([], words.map(tokenize))));
+    var status = document.getElementById("search-status"), out = document.getElementById("search-results");
+    out.innerHTML = "";
+    if (!words.length) { status.textContent = ""; return; }
+    var shards = Array.from(new Set(terms.map(shardOf)));
+    Promise.all(shards.map(function (n) {
+        return load("shard-" + n, "search/terms-" + n + ".js", function () { return n in SEARCH.shards; });
+    })).then(function () {
+        var docs = SEARCH.index.docs, scores = null;
+        terms.forEach(function (term) {
+            var postings = SEARCH.shards[shardOf(term)][term] || [], next = {};
+            var idf = Math.log(1 + (docs.length - postings.length + 0.5) / (postings.length + 0.5));
+            postings.forEach(function (p) {
+                if (scores === null || p[0] in scores) next[p[0]] = (scores ? scores[p[0]] : 0) + idf * p[1] / (p[1] + docs[p[0]].length / 1000);
+            });
+            scores = next;
+        });
+        // No index terms (e.g. a single Thai letter): scan every document
+        if (scores === null) { scores = {}; docs.forEach(function (d, i) { scores[i] = 0; }); }
+        var ranked = Object.keys(scores).sort(function (a, b) { return scores[b] - scores[a]; });
+        if (terms.length) ranked = ranked.slice(0, 30);
+        return Promise.all(ranked.map(function (i) {
+            var id = docs[i].id;
+            return load("doc-" + id, "search/docs/" + id + ".js", function () { return id in SEARCH.docs; });
+        })).then(function () {
+            var shown = 0;
+            ranked.forEach(function (i) {
+                var doc = SEARCH.docs[docs[i].id], lower = doc.text.toLowerCase();
+                if (shown >= 30 || !words.every(function (w) { return lower.indexOf(w) >= 0; })) return;
+                shown++;
+                out.insertAdjacentHTML("beforeend", '<h3><a href="' + docs[i].url + '">' + escapeHtml(docs[i].title) +
+                    "</a></h3><p>" + snippet(doc.text, [words.join(" ")].concat(words)) + "</p>");
+            });
+            status.textContent = shown ? "พบ " + shown + " บทความ" : "ไม่พบผลลัพธ์";
+        });
+    });
+}
+document.getElementById("search-form").addEventListener("submit", function (e) {
+    e.preventDefault();
+    search(document.getElementById("search-box").value);
+});
+load("index", "search/index.js", function () { return SEARCH.index !== null; }).then(function () {
+    var q = new URLSearchParams(location.search).get("q");
+    if (q) { document.getElementById("search-box").value = q; search(q); }
+});
+</script>"""
+
+def plain_text(md_text):
+    # Readable text for search snippets: markdown syntax stripped
+    text = re.sub(r'<[^>]+>', ' ', md_text)
+    text = re.sub(r'!?\[([^\]]*)\]\([^)]*\)', r'\1', text)
+    text = re.sub(r'^\s*[-=:| ]{3,}\s*$', ' ', text, flags=re.M)
+    text = re.sub(r'[#*>`|_~]+', ' ', text)
+    return ' '.join(text.split())
+
+def shard_of(term):
+    return sum(ord(c) for c in term) % SEARCH_SHARDS
+
+def js_call(callback, *args):
+    payload = ", ".join(json.dumps(a, ensure_ascii=False, separators=(',', ':'), sort_keys=True) for a in args)
+    return f"{callback}({payload});\n".encode('utf-8')
+
+def write_if_changed(path, data):
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            if f.read() == data:
+                return False
+    with open(path, 'wb') as f:
+        f.write(data)
+    return True
+
+def update_search_index(output_dir, input_dir, files, chunks, timestamp):
+    """Emit the browser search index for every article in `files`.
+
+    Term counts are cached in each manifest entry, so only articles the
+    build saw change (entries without "terms") are re-read. Returns True
+    if any manifest entry was updated.
+    """
+    search_dir = os.path.join(output_dir, SEARCH_DIR)
+    docs_dir = os.path.join(search_dir, "docs")
+    os.makedirs(docs_dir, exist_ok=True)
+    updated = False
+
+    # 1. Per-article data (only for changed articles)
+    for filename in sorted(files):
+        entry = files[filename]
+        doc_id = filename[:-len('.md')]
+        doc_path = os.path.join(docs_dir, doc_id + ".js")
+        if "terms" in entry and os.path.exists(doc_path):
+            continue
+        with open(os.path.join(input_dir, filename), 'r', encoding='utf-8') as f:
+            md_text = f.read()
+        text = plain_text(md_text)
+        from search_index import tokenize, normalize
+        terms = Counter(tokenize(normalize(text)))
+        entry.update(title=get_title(md_text), terms=dict(terms), length=sum(terms.values()))
+        updated = True
+        url = filename.replace('.md', '.html')
+        if write_if_changed(doc_path, js_call("SEARCH_DOC", doc_id, {"text": text, "title": entry["title"], "url": url})):
+            print(f"Indexing: {filename}")
+
+    # 2. Documents table and term shards (rewritten only if their bytes change)
+    docs = []
+    shards = [dict() for _ in range(SEARCH_SHARDS)]
+    for number, filename in enumerate(sorted(files)):
+        entry = files[filename]
+        docs.append({"id": filename[:-len('.md')], "title": entry["title"],
+                     "url": filename.replace('.md', '.html'), "length": entry["length"]})
+        for term, tf in entry["terms"].items():
+            shards[shard_of(term)].setdefault(term, []).append([number, tf])
+    write_if_changed(os.path.join(search_dir, "index.js"),
+                     js_call("SEARCH_INDEX", {"docs": docs, "shards": SEARCH_SHARDS}))
+    for number, shard in enumerate(shards):
+        write_if_changed(os.path.join(search_dir, f"terms-{number}.js"), js_call("SEARCH_SHARD", number, shard))
+
+    # 3. Drop docs of deleted articles
+    keep = {d["id"] + ".js" for d in docs}
+    for name in os.listdir(docs_dir):
+        if name not in keep:
+            os.remove(os.path.join(docs_dir, name))
+
+    # 4. The search page itself (timestamp only changes with its content)
+    title = "ค้นหาบทความ"
+    page_path = os.path.join(output_dir, SEARCH_PAGE)
+    if not body_unchanged(page_path, page_body(chunks, title, SEARCH_PAGE_CONTENT)):
+        print(f"Writing search page: {SEARCH_PAGE}")
+        with open(page_path, 'wb') as f:
+            f.write(fill_page(chunks, title, SEARCH_PAGE_CONTENT, timestamp))
+    return updated
+
+CITED_BY_PAGE = "cited_by.html"
+
+def cited_by_content(graph, articles):
+    import citation_index
+    # One section per ruling (anchor = ruling key), grouped by issuer,
+    # listing the articles that cite it
+    by_kind = {}
+    for key, ruling in graph["rulings"].items():
+        by_kind.setdefault(key.split("_")[0], []).append((key, ruling))
+
+    parts = ["<h1>คำพิพากษาและคำวินิจฉัยที่ถูกอ้างอิง</h1>"]
+    for kind in sorted(by_kind, key=lambda k: list(citation_index.KIND_TITLES).index(k)
+                       if k in citation_index.KIND_TITLES else len(citation_index.KIND_TITLES)):
+        parts.append(f"<h2>{html.escape(citation_index.KIND_TITLES.get(kind, kind))}</h2>")
+        for key, ruling in sorted(by_kind[kind], key=lambda kr: kr[0]):
+            parts.append(f'<h3 id="{key}">{html.escape(ruling["title"] or key)}</h3>')
+            if ruling["source"]:
+                source = html.escape("../../" + ruling["source"])
+                parts.append(f'<p>📄 สรุปคำวินิจฉัย: <a href="{source}">{html.escape(os.path.basename(ruling["source"]))}</a></p>')
+            items = []
+            for article, label in ruling["cited_by"]:
+                if article not in articles:
+                    continue
+                url = html.escape(article.replace('.md', '.html'))
+                title = html.escape(articles[article] or article)
+                items.append(f'<li><a href="{url}">{title}</a> {html.escape(label)}</li>')
+            if items:
+                parts.append("<p>ถูกอ้างอิงโดย:</p>\n<ul>\n" + "\n".join(items) + "\n</ul>")
+            else:
+                parts.append("<p><em>ยังไม่มีบทความอ้างถึง</em></p>")
+    return "\n".join(parts)
+
+SUP_LABEL = re.compile(r'<sup>(\[\d+\])</sup>')
+HTML_HEADING = re.compile(r'(<h[1-6][^>]*>.*?</h[1-6]>)', re.S)
+# Existing links and tags are left alone; only text between them is linked
+HTML_TAG_OR_LINK = re.compile(r'(<a\b.*?</a>|<[^>]+>)', re.S)
+REFERENCES_TITLE = re.compile(r'reference|อ้างอิง', re.I)
+
+def link_citations(content, text):
+    """Backlinks from an article to the "cited by" page: every <sup>[n]</sup>
+    marker of a ruling citation, and every ruling named in the References
+    section, links to cited_by.html#<ruling key>.
+
+    Only the article's own citations are used, so the page still depends
+    on nothing but its source.
+    """
+    import citation_index
+    citations = citation_index.parse_article(text)
+    if not citations:
+        return content
+    labels = {c["label"]: c["keys"][0] for c in citations if c["label"]}
+    cited = {key for c in citations for key in c["keys"]}
+
+    def link(key, label):
+        return f'<a href="{CITED_BY_PAGE}#{key}">{label}</a>'
+
+    def link_sup(m):
+        key = labels.get(m.group(1))
+        return f"<sup>{link(key, m.group(1))}</sup>" if key else m.group(0)
+
+    def link_rulings(part):
+        out, pos = [], 0
+        for start, end, key in citation_index.ruling_spans(part):
+            if key in cited:
+                out.append(part[pos:start] + link(key, part[start:end]))
+                pos = end
+        return "".join(out) + part[pos:]
+
+    sections = HTML_HEADING.split(SUP_LABEL.sub(link_sup, content))
+    in_refs = False
+    for i, section in enumerate(sections):
+        if i % 2:
+            in_refs = bool(REFERENCES_TITLE.search(re.sub(r'<[^>]+>', '', section)))
+        elif in_refs:
+            parts = HTML_TAG_OR_LINK.split(section)
+            sections[i] = "".join(p if j % 2 else link_rulings(p) for j, p in enumerate(parts))
+    return "".join(sections)
+
+def article_titles(input_dir, files):
+    """{filename: title} for the manifest entries in files. Titles are
+    cached in the entries; returns (titles, True if any entry changed)."""
+    titles = {}
+    updated = False
+    for filename in files:
+        entry = files[filename]
+        if "title" not in entry:
+            with open(os.path.join(input_dir, filename), 'r', encoding='utf-8') as f:
+                entry["title"] = get_title(f.read())
+            updated = True
+        titles[filename] = entry["title"]
+    return titles, updated
+
+def update_cited_by_page(output_dir, input_dir, files, chunks, timestamp):
+    """Emit the "cited by" page from the citation graph.
+
+    citation_index keeps parsed citations in its own cache (keyed by file
+    hash), so only changed articles and summaries are re-read. The page
+    is rewritten only when its content changes. Returns True if any
+    manifest entry was updated.
+    """
+    import citation_index
+    graph = citation_index.load_graph()
+    articles, updated = article_titles(input_dir, files)
+
+    title = "อ้างอิงโดย"
+    content = cited_by_content(graph, articles)
+    page_path = os.path.join(output_dir, CITED_BY_PAGE)
+    if not body_unchanged(page_path, page_body(chunks, title, content)):
+        print(f"Writing citation page: {CITED_BY_PAGE}")
+        with open(page_path, 'wb') as f:
+            f.write(fill_page(chunks, title, content, timestamp))
+    return updated
+
+INDEX_PAGE = "index.html"
+RELEASE_DIR = "articles/release"
+
+def index_content(titles, families, output_dir):
+    # Every article, variants listed under their family's main article
+    parts = ["<h1>บทความทั้งหมด</h1>"]
+    links = [(SEARCH_PAGE, "🔍 ค้นหาบทความ"), (CITED_BY_PAGE, "⚖️ คำพิพากษาและคำวินิจฉัยที่ถูกอ้างอิง")]
+    links = [(page, label) for page, label in links if os.path.exists(os.path.join(output_dir, page))]
+    if links:
+        parts.append("<p>" + " · ".join(f'<a href="{page}">{label}</a>' for page, label in links) + "</p>")
+    parts.append("<ul>")
+    for family, members in sorted(families.items()):
+        members = [m for m in members if m in titles]
+        if not members:
+            continue
+        items = [f'<a href="{html.escape(m.replace(".md", ".html"))}">{html.escape(titles[m] or m)}</a>'
+                 for m in members]
+        if len(items) == 1:
+            parts.append(f"<li>{items[0]}</li>")
+        else:
+            parts.append(f"<li>{items[0]}\n<ul>\n" + "\n".join(f"<li>{i}</li>" for i in items[1:]) + "\n</ul></li>")
+    parts.append("</ul>")
+    return "\n".join(parts)
+
+def update_index_page(output_dir, input_dir, files, families, chunks, timestamp):
+    # Same rules as the other generated pages; returns True if any
+    # manifest entry was updated
+    titles, updated = article_titles(input_dir, files)
+    title = "บทความทั้งหมด"
+    content = index_content(titles, families, output_dir)
+    page_path = os.path.join(output_dir, INDEX_PAGE)
+    if not body_unchanged(page_path, page_body(chunks, title, content)):
+        print(f"Writing index page: {INDEX_PAGE}")
+        with open(page_path, 'wb') as f:
+            f.write(fill_page(chunks, title, content, timestamp))
+    return updated
+
+def write_release(output_dir, files):
+    """Minified, precompressed copy of the site in RELEASE_DIR (see
+    release_bundle.py); only pages whose content changed are redone."""
+    import release_bundle
+    names = [f.replace('.md', '.html') for f in files] + [INDEX_PAGE, SEARCH_PAGE, CITED_BY_PAGE]
+    count, raw, packed = release_bundle.write_release(output_dir, RELEASE_DIR, names, (SEARCH_DIR, ASSETS_DIR))
+    print(f"📦 Release: {count} files in {RELEASE_DIR}/, {raw // 1024} KB -> {packed // 1024} KB gzip")
+
+def generate_html(jobs=1, only=None, css="inline", search=False, citations=False, skip=SKIP_PATTERNS, release=False):
+    # Timed as one stage (with a lap per step) when tracing
+    with ppp_trace.stage("generate_html"):
+        build_pages(jobs, only, css, search, citations, skip, release)
+
+def build_pages(jobs, only, css, search, citations, skip, release):
     # Target directory
     input_dir = "articles"
     output_dir = "articles/html"
@@ -173,67 +836,238 @@ def generate_html():
         print(f"Created directory: {output_dir}")
 
     # Find all MD files
-    md_files = glob.glob(os.path.join(input_dir, "*.md"))
+    md_files = sorted(glob.glob(os.path.join(input_dir, "*.md")))
+    skipped = [f for f in md_files if is_skipped(os.path.basename(f), skip)]
+    md_files = [f for f in md_files if f not in skipped]
+    families = variant_families([os.path.basename(f) for f in md_files])
+    if only is not None:
+        md_files = [f for f in md_files if os.path.basename(f) in only]
     
     if not md_files:
         print("No markdown files found to convert.")
         return
 
     print(f"Found {len(md_files)} markdown files. Converting...")
-    
+    if only is None:
+        for family, members in sorted(families.items()):
+            if len(members) > 1:
+                print(f"Variant family: {family} ({len(members)} files)")
+        for md_file in skipped:
+            print(f"Skipping (Rule): {os.path.basename(md_file)}")
+
+    if css == "external":
+        style_name = write_stylesheet(output_dir)
+        style = stylesheet_link(style_name)
+    else:
+        style_name = None
+        style = inline_style()
+    chunks = compile_template(HTML_TEMPLATE, style)
+
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    manifest = load_manifest(manifest_path, css, citations)
+    old_files = manifest["files"]
+    old_style_name = manifest.get("stylesheet")
+    # A partial build keeps every entry it didn't look at
+    new_files = {} if only is None else {f: e for f, e in old_files.items() if not is_skipped(f, skip)}
+    timestamp = datetime.now().strftime("%d/%m/%Y %H:%M")
+
+    # Articles deleted since the last build: drop their entries and pages
+    for filename in sorted(old_files):
+        if os.path.exists(os.path.join(input_dir, filename)):
+            continue
+        new_files.pop(filename, None)
+        page_path = os.path.join(output_dir, filename.replace('.md', '.html'))
+        if os.path.exists(page_path):
+            print(f"Removing: {os.path.basename(page_path)}")
+            os.remove(page_path)
+
+    # 1. Manifest check: stat first, hash only if the stat moved.
+    # Anything still dirty becomes a render task.
+    tasks = {}
+    for md_file in md_files:
+        filename = os.path.basename(md_file)
+        output_path = os.path.join(output_dir, filename.replace('.md', '.html'))
+
+        entry = old_files.get(filename)
+        # A missing page is rebuilt whatever its source looks like
+        state, st, digest, data = file_state.check_file(
+            md_file, entry if os.path.exists(output_path) else None)
+        if state == "same":
+            new_files[filename] = entry
+            continue
+        if state == "touched":
+            # Touched but not changed: keep the cached blocks, terms and title
+            new_files[filename] = dict(entry, size=st.st_size, mtime_ns=st.st_mtime_ns)
+            continue
+        new_files[filename] = {
+            "sha256": digest,
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+        }
+        tasks[filename] = (data.decode('utf-8'), output_path, entry is None)
+
+    # 2. Convert through the block cache: blocks shared between variants
+    # (or unchanged since the last build) are converted once, the rest in
+    # parallel if asked
+    block_cache_path = os.path.join(output_dir, BLOCK_CACHE_NAME)
+    block_cache = load_block_cache(block_cache_path) if tasks else {}
+    texts = [t[0] for t in tasks.values()]
+    ppp_trace.lap("manifest check", files=len(md_files), dirty=len(tasks))
+    contents, block_hashes, converted, seconds = convert_blocks(texts, block_cache, jobs)
+    ppp_trace.lap("convert", blocks=converted, jobs=jobs)
+    pages = {}
+    for filename, text, content, hashes, elapsed in zip(tasks, texts, contents, block_hashes, seconds):
+        _, output_path, compare = tasks[filename]
+        new_files[filename]["blocks"] = hashes
+        ppp_trace.record("markdown", elapsed, file=filename)
+        if citations:
+            content = link_citations(content, text)
+        started = time.perf_counter()
+        pages[filename] = render_article((get_title(text), content, output_path, timestamp, compare, chunks))
+        ppp_trace.record("template fill", time.perf_counter() - started, file=filename)
+    if tasks:
+        total = sum(len(h) for h in block_hashes)
+        print(f"Blocks: {converted} converted, {total - converted} reused")
+        # Keep only blocks some tracked article still uses
+        used = {d for e in new_files.values() for d in e.get("blocks", ())}
+        if converted or set(block_cache) - used:
+            save_block_cache(block_cache_path, {d: h for d, h in block_cache.items() if d in used})
+    ppp_trace.lap("render")
+
+    # 3. Report and write in source order
     for md_file in md_files:
         filename = os.path.basename(md_file)
         html_filename = filename.replace('.md', '.html')
-        output_path = os.path.join(output_dir, html_filename)
-        
-        # Read Markdown
-        with open(md_file, 'r', encoding='utf-8') as f:
-            text = f.read()
-            
-        # Get Title (assume first line header)
-        lines = text.split('\n')
-        title = "Document"
-        for line in lines:
-            if line.startswith('# '):
-                title = line.replace('# ', '').strip()
-                break
-        
-        # Convert to HTML
-        html_content = markdown.markdown(text, extensions=['tables', 'fenced_code'])
-        
-        # Determine if we need to write (Smart Update)
-        # 1. Generate new content WITHOUT timestamp (for comparison)
-        content_template = HTML_TEMPLATE.split('<div class="footer">')[0]
-        new_body = content_template.format(title=title, content=html_content, timestamp="")
-        
-        should_write = True
-        if os.path.exists(output_path):
-            with open(output_path, 'r', encoding='utf-8') as f:
-                old_full_html = f.read()
-            
-            # Extract body from old file (everything before footer)
-            if '<div class="footer">' in old_full_html:
-                old_body = old_full_html.split('<div class="footer">')[0]
-                
-                # Normalize (strip warnings, newlines might differ)
-                if old_body.strip() == new_body.strip():
-                    should_write = False
-                    print(f"Skipping (No Change): {html_filename}")
-
-        if should_write:
-            print(f"Converting: {filename} -> {html_filename}")
-            # Fill Template with CURRENT Time
-            final_html = HTML_TEMPLATE.format(
-                title=title,
-                content=html_content,
-                timestamp=datetime.now().strftime("%d/%m/%Y %H:%M")
-            )
-            
-            # Write HTML
-            with open(output_path, 'w', encoding='utf-8') as f:
-                f.write(final_html)
+        final_html = pages.get(filename)
+        if final_html is None:
+            print(f"Skipping (No Change): {html_filename}")
+            continue
+
+        print(f"Converting: {filename} -> {html_filename}")
+        # Write HTML in one buffered write
+        started = time.perf_counter()
+        with open(os.path.join(output_dir, html_filename), 'wb') as f:
+            f.write(final_html)
+        ppp_trace.record("file write", time.perf_counter() - started, file=html_filename, bytes=len(final_html))
+    ppp_trace.lap("write")
+
+    # 4. Stylesheet changed: relink the pages that weren't re-rendered
+    if style_name and old_style_name and old_style_name != style_name:
+        for filename in sorted(new_files):
+            if pages.get(filename) is not None:
+                continue
+            html_filename = filename.replace('.md', '.html')
+            if restyle_page(os.path.join(output_dir, html_filename), old_style_name, style_name):
+                print(f"Restyling: {html_filename}")
+    if style_name:
+        remove_old_stylesheets(output_dir, style_name)
+    ppp_trace.lap("restyle")
+
+    # 5. Browser search index, from the same change detection
+    search_updated = search and update_search_index(output_dir, input_dir, new_files, chunks, timestamp)
+    ppp_trace.lap("search index")
+
+    # 6. Citation graph: which articles cite each ruling
+    citations_updated = citations and update_cited_by_page(output_dir, input_dir, new_files, chunks, timestamp)
+    ppp_trace.lap("citations")
+
+    # 7. Release bundle: index page, then minified + precompressed copies
+    index_updated = release and update_index_page(output_dir, input_dir, new_files, families, chunks, timestamp)
+    if release:
+        write_release(output_dir, new_files)
+        ppp_trace.lap("release")
+
+    # Entries for deleted articles are dropped here
+    if (new_files != old_files or old_style_name != style_name or search_updated or citations_updated or index_updated
+            or not os.path.exists(manifest_path)):
+        manifest["files"] = new_files
+        if style_name:
+            manifest["stylesheet"] = style_name
+        save_manifest(manifest_path, manifest)
+    ppp_trace.lap("manifest save")
             
     print("✅ HTML generation complete!")
 
+def snapshot(input_dir):
+    # Cheap view of the article folder: name -> (mtime, size)
+    state = {}
+    with os.scandir(input_dir) as it:
+        for e in it:
+            if e.name.endswith('.md') and e.is_file():
+                st = e.stat()
+                state[e.name] = (st.st_mtime_ns, st.st_size)
+    return state
+
+def watch(jobs=1, css="inline", search=False, citations=False, skip=SKIP_PATTERNS, release=False, interval=0.5, debounce=0.3):
+    """Rebuild touched articles on save until interrupted (Ctrl+C).
+
+    Polls articles/ with os.scandir, so it works the same on macOS and
+    Linux without a file-watching service. The converter and template
+    stay warm in this process between rebuilds.
+    """
+    input_dir = "articles"
+    generate_html(jobs=jobs, css=css, search=search, citations=citations, skip=skip, release=release)
+    state = snapshot(input_dir)
+    print(f"👀 Watching {input_dir}/ for changes (Ctrl+C to stop)...")
+
+    try:
+        while True:
+            time.sleep(interval)
+            current = snapshot(input_dir)
+            if current == state:
+                continue
+
+            # Debounce: editors often write a file several times per save
+            while True:
+                time.sleep(debounce)
+                settled = snapshot(input_dir)
+                if settled == current:
+                    break
+                current = settled
+
+            touched = {n for n, s in current.items() if state.get(n) != s}
+            removed = sorted(set(state) - set(current))
+            for name in removed:
+                print(f"Removed: {name}")
+            state = current
+            if removed:
+                # Full build: drops the pages and index entries of deleted articles
+                generate_html(jobs=jobs, css=css, search=search, citations=citations, skip=skip, release=release)
+            elif touched:
+                generate_html(jobs=jobs, only=touched, css=css, search=search, citations=citations, skip=skip, release=release)
+    except KeyboardInterrupt:
+        print("\n👋 Stopped watching.")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Convert articles/*.md to styled HTML pages.")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="worker processes for markdown conversion (0 = one per CPU)")
+    parser.add_argument("--css", choices=CSS_MODES, default="inline",
+                        help="inline the stylesheet in every page, or link one shared hashed file in articles/html/assets/")
+    parser.add_argument("--search", action="store_true",
+                        help=f"also emit an offline search page ({SEARCH_PAGE}) and its index in articles/html/{SEARCH_DIR}/")
+    parser.add_argument("--release", action="store_true",
+                        help=f"also write {INDEX_PAGE} and a minified, gzip-precompressed copy of the site to {RELEASE_DIR}/")
+    parser.add_argument("--profile", action="store_true",
+                        help=f"write per-stage and per-file timings to {ppp_trace.TRACE_DIR}/ (same as PPP_TRACE=1)")
+    parser.add_argument("--cprofile", action="store_true", help="--profile plus a cProfile dump")
+    parser.add_argument("-w", "--watch", action="store_true",
+                        help="keep running and rebuild articles as they are saved")
+    parser.add_argument("--skip", action="append", metavar="PATTERN",
+                        help=f"leave out articles matching this file name pattern (repeatable; default: {' '.join(SKIP_PATTERNS)})")
+    parser.add_argument("--no-skip", action="store_true", help="build every article, backups included")
+    parser.add_argument("--citations", action="store_true",
+                        help=f"also emit a \"cited by\" page ({CITED_BY_PAGE}) linking each ruling to the articles that cite it")
+    args = parser.parse_args(argv)
+    if args.jobs <= 0:
+        args.jobs = os.cpu_count() or 1
+    args.skip = () if args.no_skip else tuple(args.skip or SKIP_PATTERNS)
+    return args
+
 if __name__ == "__main__":
-    generate_html()
+    args = parse_args()
+    ppp_trace.start("generate_html", args.profile, args.cprofile)
+    if args.watch:
+        watch(jobs=args.jobs, css=args.css, search=args.search, citations=args.citations, skip=args.skip, release=args.release)
+    else:
+        generate_html(jobs=args.jobs, css=args.css, search=args.search, citations=args.citations, skip=args.skip, release=args.release)
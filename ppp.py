@@ -0,0 +1,122 @@
+import os
+import sys
+import subprocess
+
+import update_diary
+import generate_html
+import diary_store
+import ppp_trace
+import blob_store
+import push_queue
+
+# The whole `ppp` flow in one Python process:
+# stage -> suggest -> build HTML -> diary entry -> commit -> show log -> push.
+# Usage: python3 ppp.py [--profile] [--wait] ["Message"] ["Context (Why & How)"]
+# --profile (or PPP_TRACE=1) times every stage and git call; see ppp_trace.py
+
+def git(*args):
+    with ppp_trace.stage("git " + args[0]):
+        return subprocess.call(["git", *args])
+
+def ask(prompt):
+    try:
+        return input(prompt).strip()
+    except EOFError:
+        return ""
+
+def main(argv, wait=False):
+    # 1. Stage all changes first; once a blob remote is set, binaries go
+    #    to the blob store and only their pointer files are committed
+    #    (see blob_store.py)
+    with ppp_trace.stage("blobs"):
+        blob_store.stage_binaries()
+    git("add", ".")
+
+    # 2. Get Smart Suggestion (one `git diff --cached` for every file)
+    with ppp_trace.stage("suggest"):
+        auto_cat, auto_msg, auto_details = update_diary.suggest()
+
+    user_story = ""
+    if argv:
+        # Non-Interactive Mode
+        log = argv[0]
+        user_story = argv[1] if len(argv) > 1 else ""
+        category = "content"  # Default category for auto-push
+        details = ""
+
+        print("🤖 เริ่มระบบ Auto-Push (โหมดอัตโนมัติ)")
+        print(f"📝 ข้อความบันทึก: {log}")
+        if user_story:
+            print(f"📖 บริบทเพิ่มเติม: {user_story}")
+    else:
+        # Interactive Mode
+        print("🤖 ระบบวิเคราะห์การทำงานของคุณ...")
+        print("---------------------------------------------------")
+        print(f"📂 หมวดงาน: {auto_cat}")
+        print(f"📝 ข้อความแนะนำ: {auto_msg}")
+        print("---------------------------------------------------")
+        print("💡 กด [Enter] เพื่อใช้ข้อความนี้ หรือพิมพ์ใหม่เพื่อแก้ไข")
+        log = ask("👉 บันทึกของคุณ (ภาษาไทย): ") or auto_msg
+        category = auto_cat
+        details = auto_details
+
+        print("💬 เพิ่มบริบทของงาน (Context) - ทำไม? อย่างไร? (สำคัญมาก!) - กด [Enter] เพื่อข้าม")
+        user_story = ask("👉 บริบท (ภาษาไทย): ")
+
+    if user_story:
+        # Combine User Story with Auto File Details
+        details = f"{user_story}\\n{details}"
+
+    # 3. Generate HTML
+    print("🎨 กำลังสร้างเอกสาร HTML ระดับพรีเมียม (Smart Build)...")
+    generate_html.generate_html(jobs=os.cpu_count() or 1, search=True, citations=True)
+
+    # 4. Update Diary (reuses the staged diff parsed for the suggestion)
+    print("🤖 กำลังอัปเดต Diary อัจฉริยะ...")
+    with ppp_trace.stage("diary"):
+        if diary_store.migrate_legacy():
+            print(f"📦 แยกบันทึกเป็นรายเดือนใน {diary_store.DIARY_DIR}/ เรียบร้อย")
+        update_diary.add_entry(category, log, details)
+
+    # 5. Stage EVERYTHING again (to capture generated artifacts) and commit
+    git("add", ".")
+    update_diary.forget_staged_diff()
+    git("commit", "-m", log)
+    print("✅ บันทึกลง Diary และ Commit ไฟล์ทั้งหมดเรียบร้อย")
+
+    # 6. Show Latest Log Verification
+    print("---------------------------------------------------")
+    print("👀 ตัวอย่างบันทึกล่าสุดที่ถูกจัดเก็บ:")
+    with ppp_trace.stage("read latest"):
+        update_diary.read_latest_mode()
+    print("---------------------------------------------------")
+
+    # 7. Push in the background (push_queue.py): the worker sends blobs,
+    #    then the commit, and keeps retrying while offline.
+    #    --wait pushes here and now instead.
+    if not wait:
+        item = push_queue.enqueue()
+        print(f"📮 เข้าคิวส่งขึ้น GitHub แล้ว (#{item['id']}) ทำงานต่อได้เลย - ดูสถานะ: python3 push_queue.py status")
+        return 0
+
+    remote = blob_store.blob_remote()
+    if remote:
+        with ppp_trace.stage("blobs push"):
+            try:
+                blob_store.push_blobs(remote)
+            except OSError as e:
+                print(f"❌ ส่งไฟล์ไบนารีไม่สำเร็จ: {e}")
+                return 1
+    missing = blob_store.unpushed_pointers(remote)
+    if missing:
+        print(f"❌ ไม่ส่งขึ้น GitHub: ไฟล์ไบนารียังไม่อยู่ในที่เก็บ ({remote or 'ยังไม่ได้ตั้ง git config ppp.blobRemote'}): {', '.join(missing)}")
+        return 1
+
+    print("🚀 กำลังนำส่งขึ้น GitHub...")
+    return git("push")
+
+if __name__ == "__main__":
+    argv, profile, cprofile = ppp_trace.strip_flags(sys.argv[1:])
+    ppp_trace.start("ppp", profile, cprofile)
+    wait = "--wait" in argv
+    sys.exit(main([a for a in argv if a != "--wait"], wait))
@@ -0,0 +1,131 @@
+import os
+import sys
+import json
+import time
+import atexit
+import datetime
+import contextlib
+
+# Per-stage timing for the ppp pipeline. Off unless a tool is run with
+# --profile (or PPP_TRACE=1 is set); then every stage, per-file step and
+# git call is written to a JSON trace when the process exits.
+#   PPP_TRACE=1          trace to .cache/trace/<tool>-<time>.json
+#   PPP_TRACE=cprofile   ... plus a cProfile dump next to it (.prof)
+#   PPP_TRACE_FILE=path  write the trace here instead
+
+TRACE_DIR = os.path.join(".cache", "trace")
+FLAGS = ("--profile", "--cprofile")
+
+_trace = None
+_stack = []
+_laps = {}
+_profiler = None
+
+def enabled():
+    return _trace is not None
+
+def start(tool, profile=False, cprofile=False):
+    """Start tracing this process if asked to (flag or PPP_TRACE).
+
+    Safe to call from every entry point: the first call wins, so ppp
+    and the modules it imports share one trace.
+    """
+    global _trace, _profiler
+    env = os.environ.get("PPP_TRACE", "")
+    cprofile = cprofile or env == "cprofile"
+    if not (profile or cprofile or env not in ("", "0")):
+        return False
+    if _trace is not None:
+        return True
+
+    _trace = {
+        "tool": tool,
+        "argv": sys.argv,
+        "started": datetime.datetime.now().isoformat(timespec="seconds"),
+        "events": [],
+        "t0": time.perf_counter(),
+    }
+    if cprofile:
+        import cProfile
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+    atexit.register(finish)
+    return True
+
+def strip_flags(argv):
+    """(argv without --profile/--cprofile, profile, cprofile) for tools
+    that read sys.argv by hand."""
+    rest = [a for a in argv if a not in FLAGS]
+    return rest, "--profile" in argv, "--cprofile" in argv
+
+def _path(name):
+    return "/".join(_stack + [name])
+
+def record(name, seconds, **info):
+    """Add a finished step (e.g. one file's conversion) to the trace."""
+    if _trace is None:
+        return
+    now = time.perf_counter() - _trace["t0"]
+    event = {"stage": _path(name), "start_s": round(now - seconds, 6), "duration_s": round(seconds, 6)}
+    event.update(info)
+    _trace["events"].append(event)
+
+@contextlib.contextmanager
+def stage(name, **info):
+    """Time a block of work; stages nest as "outer/inner"."""
+    if _trace is None:
+        yield
+        return
+    started = time.perf_counter()
+    _stack.append(name)
+    _laps[len(_stack)] = started
+    try:
+        yield
+    finally:
+        _stack.pop()
+        record(name, time.perf_counter() - started, **info)
+
+def lap(name, **info):
+    """Record the time since the previous lap (or the start of the
+    enclosing stage) as step `name`, for code that runs in sequence."""
+    if _trace is None:
+        return
+    now = time.perf_counter()
+    depth = len(_stack)
+    record(name, now - _laps.get(depth, _trace["t0"]), **info)
+    _laps[depth] = now
+
+def summary(events):
+    # Total time and count per stage name, slowest first
+    totals = {}
+    for event in events:
+        total = totals.setdefault(event["stage"], {"total_s": 0.0, "count": 0})
+        total["total_s"] += event["duration_s"]
+        total["count"] += 1
+    for total in totals.values():
+        total["total_s"] = round(total["total_s"], 6)
+    return dict(sorted(totals.items(), key=lambda kv: -kv[1]["total_s"]))
+
+def finish():
+    """Write the trace (and cProfile dump); runs at exit."""
+    global _trace, _profiler
+    if _trace is None:
+        return None
+    trace, _trace = _trace, None
+    trace["total_s"] = round(time.perf_counter() - trace.pop("t0"), 6)
+    trace["summary"] = summary(trace["events"])
+
+    path = os.environ.get("PPP_TRACE_FILE")
+    if not path:
+        stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(TRACE_DIR, f"{trace['tool']}-{stamp}.json")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    if _profiler is not None:
+        _profiler.disable()
+        trace["cprofile"] = os.path.splitext(path)[0] + ".prof"
+        _profiler.dump_stats(trace["cprofile"])
+        _profiler = None
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(trace, f, ensure_ascii=False, indent=2)
+    print(f"⏱  Trace: {path} ({trace['total_s']:.3f} s)", file=sys.stderr)
+    return path
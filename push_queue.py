@@ -0,0 +1,259 @@
+import os
+import sys
+import json
+import time
+import fcntl
+import datetime
+import argparse
+import subprocess
+import contextlib
+
+import blob_store
+import file_state
+
+# `git push` without the wait: ppp commits locally and queues the push;
+# a detached worker process flushes the queue, retrying with exponential
+# backoff while the remote is unreachable. The queue is a small JSON file
+# inside .git, so it never shows up in a commit.
+#   python3 push_queue.py status    what is queued, retries, last push
+#   python3 push_queue.py run       flush now, in the foreground
+#   python3 push_queue.py retry     re-queue pushes that gave up
+
+QUEUE_FILE = "ppp-push-queue.json"
+LOCK_FILE = "ppp-push-queue.lock"
+WORKER_LOCK = "ppp-push-worker.lock"
+LOG_FILE = "ppp-push.log"
+BACKOFF_BASE = 5      # seconds before the first retry; doubles each time
+BACKOFF_MAX = 300
+MAX_ATTEMPTS = 10     # then the item is "failed" until `retry`
+POLL_INTERVAL = 2     # a sleeping worker still picks up new pushes this fast
+
+def git_output(*args):
+    try:
+        return subprocess.check_output(["git", *args], stderr=subprocess.DEVNULL, encoding='utf-8').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def git_dir():
+    return git_output("rev-parse", "--absolute-git-dir") or ".git"
+
+def queue_path(name=QUEUE_FILE):
+    return os.path.join(git_dir(), name)
+
+def now_iso():
+    return datetime.datetime.now().isoformat(timespec="seconds")
+
+@contextlib.contextmanager
+def locked_queue():
+    """The queue, read under an exclusive lock and saved on exit."""
+    with open(queue_path(LOCK_FILE), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            with open(queue_path(), 'r', encoding='utf-8') as f:
+                queue = json.load(f)
+        except (OSError, ValueError):
+            queue = {"next_id": 1, "items": [], "last_push": None}
+        yield queue
+        file_state.atomic_write_json(queue_path(), queue, indent=2)
+
+def push_target():
+    # (remote, branch): the upstream if there is one, else origin/<branch>
+    upstream = git_output("rev-parse", "--abbrev-ref", "--symbolic-full-name", "@{u}")
+    if upstream and "/" in upstream:
+        remote, branch = upstream.split("/", 1)
+        return remote, branch
+    return "origin", git_output("symbolic-ref", "--short", "HEAD") or "master"
+
+def enqueue(remote=None, branch=None, start=True):
+    """Queue a push of the current HEAD; starts the worker unless told not to."""
+    commit = git_output("rev-parse", "HEAD")
+    if commit is None:
+        raise RuntimeError("no commit to push")
+    default_remote, default_branch = push_target()
+    remote, branch = remote or default_remote, branch or default_branch
+    with locked_queue() as queue:
+        item = {"id": queue["next_id"], "commit": commit, "remote": remote, "branch": branch,
+                "queued": now_iso(), "state": "queued", "attempts": 0, "next_try": 0, "error": None}
+        queue["next_id"] += 1
+        queue["items"].append(item)
+    if start:
+        start_worker()
+    return item
+
+def backoff(attempts):
+    return min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX)
+
+def push(remote, branch, commit):
+    """(ok, error text). Blobs go first, and a commit with pointers whose
+    blobs are not on the blob remote is not pushed at all."""
+    blob_remote = blob_store.blob_remote()
+    if blob_remote:
+        try:
+            blob_store.push_blobs(blob_remote)
+        except OSError as e:
+            return False, f"blob push: {e}"
+    missing = blob_store.unpushed_pointers(blob_remote, commit)
+    if missing:
+        return False, f"error: blobs not on the blob remote ({blob_remote or 'none set'}): {', '.join(missing)}"
+    proc = subprocess.run(["git", "push", remote, f"{commit}:refs/heads/{branch}"],
+                          stdout=subprocess.PIPE, stderr=subprocess.STDOUT, encoding='utf-8')
+    return proc.returncode == 0, proc.stdout.strip()
+
+def error_line(output):
+    # The line of git's output that says what went wrong
+    lines = [l.strip() for l in output.splitlines() if l.strip()]
+    for line in lines:
+        if line.startswith(("fatal:", "error:", "!")):
+            return line
+    return lines[-1] if lines else "push failed"
+
+def is_ancestor(commit, descendant):
+    return subprocess.run(["git", "merge-base", "--is-ancestor", commit, descendant],
+                          stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL).returncode == 0
+
+def flush_once(force=False):
+    """Push every target with an item whose retry time has come (all
+    queued items if force). Returns the number of seconds until the next
+    retry is due, or None when nothing is left."""
+    with locked_queue() as queue:
+        queued = [i for i in queue["items"] if i["state"] == "queued"]
+        due = {(i["remote"], i["branch"]) for i in queued if force or i["next_try"] <= time.time()}
+        # All queued items of a due target go together, older ones still in
+        # backoff included: pushed later on their own they would be rejected
+        # as non-fast-forward
+        batch = [i for i in queued if (i["remote"], i["branch"]) in due]
+        batch_ids = {i["id"] for i in batch}
+        # One push per target: the newest queued commit carries the older ones
+        targets = {}
+        for item in batch:
+            targets[(item["remote"], item["branch"])] = item["commit"]
+
+    results = {}
+    for (remote, branch), commit in targets.items():
+        print(f"🚀 {now_iso()} git push {remote} {commit[:10]}:{branch}")
+        results[(remote, branch)] = push(remote, branch, commit)
+        ok, error = results[(remote, branch)]
+        print(("✅ " if ok else "⚠️  ") + (error or "pushed"))
+
+    with locked_queue() as queue:
+        for item in list(queue["items"]):
+            target = (item["remote"], item["branch"])
+            if target not in results:
+                continue
+            ok, error = results[target]
+            if ok and (item["id"] in batch_ids or is_ancestor(item["commit"], targets[target])):
+                # Pushed, or carried by the pushed commit (a failed item
+                # behind it included)
+                queue["items"].remove(item)
+                queue["last_push"] = {"commit": targets[target], "remote": item["remote"],
+                                      "branch": item["branch"], "at": now_iso()}
+                continue
+            # Items queued while we were pushing wait for the next round
+            if item["id"] not in batch_ids:
+                continue
+            item["attempts"] += 1
+            item["error"] = error_line(error)
+            if item["attempts"] >= MAX_ATTEMPTS:
+                item["state"] = "failed"
+            else:
+                item["next_try"] = time.time() + backoff(item["attempts"])
+        waiting = [i["next_try"] for i in queue["items"] if i["state"] == "queued"]
+    if not waiting:
+        return None
+    return max(0, min(waiting) - time.time())
+
+def run_worker():
+    """Flush until the queue is empty (or only failed items are left).
+    Only one worker runs per repository; a second one exits at once."""
+    while True:
+        with open(queue_path(WORKER_LOCK), 'w') as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                return False
+            lock.write(str(os.getpid()))
+            lock.flush()
+            wait = flush_once()
+            while wait is not None:
+                time.sleep(min(wait, POLL_INTERVAL))
+                wait = flush_once()
+        # A push queued just before the lock was released found it still
+        # held and started no worker: look once more
+        with locked_queue() as queue:
+            if not any(i["state"] == "queued" for i in queue["items"]):
+                return True
+
+def start_worker():
+    # Detached, so it outlives ppp and keeps retrying in the background
+    log = open(queue_path(LOG_FILE), 'a')
+    subprocess.Popen([sys.executable, os.path.abspath(__file__), "worker"],
+                     stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT,
+                     start_new_session=True)
+    log.close()
+
+def worker_running():
+    with open(queue_path(WORKER_LOCK), 'a+') as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return True
+        fcntl.flock(lock, fcntl.LOCK_UN)
+        return False
+
+def status():
+    with locked_queue() as queue:
+        items = list(queue["items"])
+        last = queue["last_push"]
+    print(f"🔄 Worker: {'กำลังทำงาน' if worker_running() else 'ไม่ได้ทำงาน'}")
+    if last:
+        print(f"✅ ส่งล่าสุด: {last['commit'][:10]} -> {last['remote']}/{last['branch']} ({last['at']})")
+    if not items:
+        print("📭 ไม่มีงานค้างในคิว")
+        return 0
+    for item in items:
+        line = f"   #{item['id']} {item['commit'][:10]} -> {item['remote']}/{item['branch']} [{item['state']}]"
+        if item["attempts"]:
+            line += f" ลองแล้ว {item['attempts']} ครั้ง"
+            if item["state"] == "queued":
+                line += f", ลองใหม่ใน {max(0, item['next_try'] - time.time()):.0f} วินาที"
+        print(line)
+        if item["error"]:
+            print(f"      {item['error']}")
+    return 1 if any(i["state"] == "failed" for i in items) else 0
+
+def retry():
+    with locked_queue() as queue:
+        for item in queue["items"]:
+            item.update(state="queued", attempts=0, next_try=0)
+        count = len(queue["items"])
+    if count:
+        start_worker()
+    print(f"🔁 ส่งใหม่ {count} รายการ")
+
+def main():
+    parser = argparse.ArgumentParser(description="Background push queue used by ppp.")
+    parser.add_argument("command", choices=("status", "push", "run", "retry", "worker"),
+                        help="status: show the queue; push: queue HEAD and start the worker; "
+                             "run: flush in the foreground; retry: re-queue failed pushes")
+    parser.add_argument("--remote")
+    parser.add_argument("--branch")
+    args = parser.parse_args()
+
+    if args.command == "status":
+        sys.exit(status())
+    elif args.command == "push":
+        item = enqueue(args.remote, args.branch)
+        print(f"📮 เข้าคิว #{item['id']}: {item['commit'][:10]} -> {item['remote']}/{item['branch']}")
+    elif args.command == "run":
+        if worker_running():
+            print("⏳ มี worker กำลังส่งงานอยู่แล้ว")
+        else:
+            flush_once(force=True)
+        sys.exit(status())
+    elif args.command == "retry":
+        retry()
+    else:
+        run_worker()
+
+if __name__ == "__main__":
+    main()
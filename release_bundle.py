@@ -0,0 +1,137 @@
+import os
+import re
+import gzip
+import json
+import hashlib
+
+import file_state
+
+# Optional: .br siblings when the brotli package is installed
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+RELEASE_MANIFEST = ".release-manifest.json"
+BUNDLE_TYPES = (".html", ".css", ".js")
+# Levels are fixed so a page always compresses to the same bytes
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+
+# Whitespace next to these tags is never rendered, so it can go
+BLOCK_TAGS = ("html|head|body|meta|link|title|style|script|div|p|h[1-6]|ul|ol|li|table|thead|tbody|"
+              "tr|td|th|blockquote|hr|br|pre|header|footer|main|nav|section|article")
+AROUND_BLOCK_TAG = re.compile(r'\s*(</?(?:' + BLOCK_TAGS + r')\b[^>]*>)\s*', re.I)
+# Contents kept byte for byte (style is minified as CSS instead)
+RAW_ELEMENT = re.compile(r'(<(pre|textarea|script)\b[^>]*>.*?</\2\s*>)', re.S | re.I)
+STYLE_ELEMENT = re.compile(r'(<style\b[^>]*>)(.*?)(</style\s*>)', re.S | re.I)
+COMMENT = re.compile(r'<!--(?!\[if).*?-->', re.S)
+CSS_COMMENT = re.compile(r'/\*.*?\*/', re.S)
+
+def minify_css(css):
+    css = CSS_COMMENT.sub('', css)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,>])\s*', r'\1', css)
+    css = re.sub(r':\s+', ':', css)
+    return css.replace(';}', '}').strip()
+
+def minify_html(text):
+    """Conservative minifier: drops comments and the whitespace the
+    browser would collapse or ignore anyway. <pre>, <textarea> and
+    <script> are left untouched; <style> is minified as CSS."""
+    parts = RAW_ELEMENT.split(text)
+    out = []
+    # split() with two groups yields: text, element, tag name, text, ...
+    for i in range(0, len(parts), 3):
+        chunk = COMMENT.sub('', parts[i])
+        styles = []
+        def keep_style(m):
+            styles.append(m.group(1) + minify_css(m.group(2)) + m.group(3))
+            return f"\x00{len(styles) - 1}\x00"
+        chunk = STYLE_ELEMENT.sub(keep_style, chunk)
+        chunk = re.sub(r'\s+', ' ', chunk)
+        chunk = AROUND_BLOCK_TAG.sub(r'\1', chunk)
+        chunk = re.sub(r'\x00(\d+)\x00', lambda m: styles[int(m.group(1))], chunk)
+        out.append(chunk)
+        if i + 1 < len(parts):
+            out.append(parts[i + 1])
+    return "".join(out).strip() + "\n"
+
+def minify(name, data):
+    if name.endswith(".html"):
+        return minify_html(data.decode('utf-8')).encode('utf-8')
+    if name.endswith(".css"):
+        return (minify_css(data.decode('utf-8')) + "\n").encode('utf-8')
+    return data
+
+def compressed_siblings(data):
+    # {suffix: bytes}; gzip with mtime 0 so unchanged input gives identical files
+    siblings = {".gz": gzip.compress(data, GZIP_LEVEL, mtime=0)}
+    if brotli is not None:
+        siblings[".br"] = brotli.compress(data, quality=BROTLI_QUALITY)
+    return siblings
+
+def load_release_manifest(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def bundle_files(output_dir, names, dirs):
+    """Relative paths to ship: the named pages plus everything under dirs."""
+    files = [n for n in names if os.path.exists(os.path.join(output_dir, n))]
+    for d in dirs:
+        for folder, _, filenames in os.walk(os.path.join(output_dir, d)):
+            for filename in filenames:
+                if filename.endswith(BUNDLE_TYPES):
+                    files.append(os.path.relpath(os.path.join(folder, filename), output_dir))
+    return sorted(set(files))
+
+def write_release(output_dir, release_dir, names, dirs=()):
+    """Minify and precompress the site into release_dir.
+
+    A file is re-minified on every release (cheap) but only rewritten and
+    re-compressed when its minified content hash changed. Files no
+    longer shipped are removed. Returns (files, raw bytes, gzip bytes).
+    """
+    os.makedirs(release_dir, exist_ok=True)
+    manifest_path = os.path.join(release_dir, RELEASE_MANIFEST)
+    old = load_release_manifest(manifest_path)
+    new = {}
+    raw_total = gz_total = 0
+
+    for rel in bundle_files(output_dir, names, dirs):
+        with open(os.path.join(output_dir, rel), 'rb') as f:
+            data = minify(rel, f.read())
+        digest = hashlib.sha256(data).hexdigest()
+        target = os.path.join(release_dir, rel)
+        suffixes = [".gz"] + ([".br"] if brotli is not None else [])
+        entry = old.get(rel)
+        if (entry and entry["sha256"] == digest and os.path.exists(target)
+                and all(os.path.exists(target + s) for s in suffixes)):
+            new[rel] = entry
+        else:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            siblings = compressed_siblings(data)
+            with open(target, 'wb') as f:
+                f.write(data)
+            for suffix, packed in siblings.items():
+                with open(target + suffix, 'wb') as f:
+                    f.write(packed)
+            new[rel] = {"sha256": digest, "size": len(data), "gz": len(siblings[".gz"])}
+            print(f"Compressing: {rel} ({len(data)} -> {len(siblings['.gz'])} bytes gz)")
+        raw_total += new[rel]["size"]
+        gz_total += new[rel]["gz"]
+
+    # Drop files (and their siblings) that are no longer shipped
+    for rel in sorted(set(old) - set(new)):
+        for suffix in ("", ".gz", ".br"):
+            path = os.path.join(release_dir, rel + suffix)
+            if os.path.exists(path):
+                os.remove(path)
+        print(f"Removing: {rel}")
+
+    if new != old:
+        file_state.atomic_write_json(manifest_path, new, indent=2, sort_keys=True)
+    return len(new), raw_total, gz_total
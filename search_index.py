@@ -0,0 +1,219 @@
+import sys
+import os
+import re
+import glob
+import math
+import time
+import sqlite3
+import argparse
+from collections import Counter
+
+import file_state
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+INDEX_PATH = os.path.join(ROOT, ".cache", "search_index.sqlite3")
+
+# Everything worth searching, relative to the repo root
+SOURCES = [
+    "articles/*.md",
+    "references/*.md",
+    "references/*.txt",
+    "diary/*.md",
+    "git_diary_v1_archive.md",
+]
+
+# Thai has no spaces between words, so Thai runs are indexed as character
+# bigrams; Latin words and numbers (e.g. "102", "force") stay whole words.
+# A lone Thai letter has no bigram and gives no term: a query for one
+# falls back to a plain scan instead of matching only one-letter runs.
+THAI_RUN = re.compile(r'[\u0e00-\u0e7f]+')
+TOKEN_RUN = re.compile(r'[\u0e00-\u0e7f]+|[0-9a-z]+')
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+SNIPPET_RADIUS = 60
+
+def normalize(text):
+    return text.lower()
+
+def tokenize(text):
+    """Index terms of a (normalized) text: Thai bigrams and whole words."""
+    terms = []
+    for run in TOKEN_RUN.findall(text):
+        if THAI_RUN.fullmatch(run):
+            terms.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            terms.append(run)
+    return terms
+
+def open_index(path=INDEX_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    db = sqlite3.connect(path)
+    db.executescript("""
+        CREATE TABLE IF NOT EXISTS docs (
+            id INTEGER PRIMARY KEY, path TEXT UNIQUE,
+            size INTEGER, mtime_ns INTEGER, sha256 TEXT,
+            length INTEGER, text TEXT);
+        CREATE TABLE IF NOT EXISTS postings (
+            term TEXT, doc INTEGER, tf INTEGER,
+            PRIMARY KEY (term, doc)) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS postings_doc ON postings (doc);
+    """)
+    return db
+
+def source_files(root=ROOT):
+    paths = set()
+    for pattern in SOURCES:
+        paths.update(glob.glob(os.path.join(root, pattern)))
+    return sorted(os.path.relpath(p, root) for p in paths)
+
+def index_doc(db, path, st, digest, text, doc_id=None):
+    terms = Counter(tokenize(normalize(text)))
+    if doc_id is None:
+        doc_id = db.execute("INSERT INTO docs (path) VALUES (?)", (path,)).lastrowid
+    else:
+        db.execute("DELETE FROM postings WHERE doc = ?", (doc_id,))
+    db.execute("UPDATE docs SET size = ?, mtime_ns = ?, sha256 = ?, length = ?, text = ? WHERE id = ?",
+               (st.st_size, st.st_mtime_ns, digest, sum(terms.values()), text, doc_id))
+    db.executemany("INSERT INTO postings VALUES (?, ?, ?)",
+                   [(term, doc_id, tf) for term, tf in terms.items()])
+
+def update_index(db, root=ROOT, verbose=False):
+    """Bring the index in line with the source files.
+
+    Unchanged files cost one stat; touched files are re-hashed and only
+    re-indexed if their content actually changed.
+    """
+    known = {row[0]: row[1:] for row in db.execute("SELECT path, id, size, mtime_ns, sha256 FROM docs")}
+    changed = 0
+
+    for path in source_files(root):
+        full_path = os.path.join(root, path)
+        row = known.pop(path, None)
+        entry = dict(zip(("size", "mtime_ns", "sha256"), row[1:])) if row else None
+        state, st, digest, data = file_state.check_file(full_path, entry)
+        if state == "same":
+            continue
+        if state == "touched":
+            db.execute("UPDATE docs SET size = ?, mtime_ns = ? WHERE id = ?",
+                       (st.st_size, st.st_mtime_ns, row[0]))
+            continue
+
+        if verbose:
+            print(f"Indexing: {path}")
+        index_doc(db, path, st, digest, data.decode('utf-8', errors='replace'),
+                  row[0] if row else None)
+        changed += 1
+
+    # Files that disappeared
+    for path, row in known.items():
+        if verbose:
+            print(f"Removing: {path}")
+        db.execute("DELETE FROM postings WHERE doc = ?", (row[0],))
+        db.execute("DELETE FROM docs WHERE id = ?", (row[0],))
+        changed += 1
+
+    db.commit()
+    return changed
+
+def make_snippet(text, phrase, words):
+    # Window around the whole phrase if present, else the earliest word,
+    # with the match marked as [[...]]
+    lowered = normalize(text)
+    pos, needle = lowered.find(phrase), phrase
+    if pos < 0:
+        hits = [(lowered.find(w), w) for w in words]
+        hits = [(p, w) for p, w in hits if p >= 0]
+        if not hits:
+            return ' '.join(text[:SNIPPET_RADIUS * 2].split())
+        pos, needle = min(hits)
+    start = max(0, pos - SNIPPET_RADIUS)
+    end = min(len(text), pos + len(needle) + SNIPPET_RADIUS)
+    snippet = (text[start:pos] + "[[" + text[pos:pos + len(needle)] + "]]"
+               + text[pos + len(needle):end])
+    snippet = ' '.join(snippet.split())
+    return ("…" if start > 0 else "") + snippet + ("…" if end < len(text) else "")
+
+def search(db, query, limit=10):
+    """Rank documents containing every word of the query (BM25).
+
+    Returns [(path, score, snippet)]. Index terms narrow the candidates;
+    each word is then checked as an exact substring, so Thai bigram
+    matches in the wrong order don't count.
+    """
+    words = normalize(query).split()
+    terms = sorted(set(t for w in words for t in tokenize(w)))
+    if not words:
+        return []
+
+    doc_count, total_length = db.execute("SELECT COUNT(*), SUM(length) FROM docs").fetchone()
+    if not doc_count:
+        return []
+    avg_length = (total_length or 0) / doc_count
+
+    # Candidates: documents holding every index term of the query
+    scores = None
+    for term in terms:
+        rows = db.execute(
+            "SELECT p.doc, p.tf, d.length FROM postings p JOIN docs d ON d.id = p.doc WHERE p.term = ?",
+            (term,)).fetchall()
+        idf = math.log(1 + (doc_count - len(rows) + 0.5) / (len(rows) + 0.5))
+        term_scores = {}
+        for doc, tf, length in rows:
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * length / (avg_length or 1))
+            term_scores[doc] = idf * tf * (BM25_K1 + 1) / (tf + norm)
+        if scores is None:
+            scores = term_scores
+        else:
+            scores = {doc: s + term_scores[doc] for doc, s in scores.items() if doc in term_scores}
+        if not scores:
+            return []
+    if scores is None:
+        # Nothing indexable (e.g. a single Thai letter): plain scan
+        scores = {row[0]: 0.0 for row in db.execute("SELECT id FROM docs")}
+
+    phrase = ' '.join(words)
+    results = []
+    for doc, score in scores.items():
+        path, text = db.execute("SELECT path, text FROM docs WHERE id = ?", (doc,)).fetchone()
+        lowered = normalize(text)
+        if not all(w in lowered for w in words):
+            continue
+        if len(words) > 1 and phrase in lowered:
+            score *= 1.5
+        results.append((path, score, make_snippet(text, phrase, words)))
+
+    results.sort(key=lambda r: (-r[1], r[0]))
+    return results[:limit]
+
+def main():
+    parser = argparse.ArgumentParser(description="Full-text search over articles, references and the diary.")
+    parser.add_argument("query", nargs="*", help="words to search for, e.g. เหตุสุดวิสัย or มาตรา 102")
+    parser.add_argument("-n", "--limit", type=int, default=10)
+    parser.add_argument("--rebuild", action="store_true", help="drop the index and build it from scratch")
+    parser.add_argument("--index", default=INDEX_PATH, help="index file (sqlite)")
+    args = parser.parse_args()
+
+    if args.rebuild and os.path.exists(args.index):
+        os.remove(args.index)
+    db = open_index(args.index)
+
+    started = time.perf_counter()
+    changed = update_index(db, verbose=not args.query)
+    if not args.query:
+        docs = db.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+        print(f"✅ Index up to date: {docs} files ({changed} updated)")
+        return
+
+    results = search(db, ' '.join(args.query), args.limit)
+    elapsed = (time.perf_counter() - started) * 1000
+    if not results:
+        print(f"ไม่พบผลลัพธ์ ({elapsed:.1f} ms)")
+        sys.exit(1)
+    for path, score, snippet in results:
+        print(f"📄 {path}  ({score:.2f})")
+        print(f"   {snippet}")
+    print(f"--- {len(results)} results in {elapsed:.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+import os
+import re
+import sys
+import json
+import mmap
+import bisect
+import hashlib
+import argparse
+from array import array
+
+import file_state
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+INDEX_DIR = os.path.join(ROOT, ".cache", "text_index")
+INDEX_VERSION = 3
+
+# Page markers as written by the transcripts in references/
+# ("==หน้า 12==", "==Page 12==", Thai or Arabic digits)
+# Matched on bytes, so Thai digits (U+0E50-0E59) are spelled out as UTF-8
+PAGE_DIGIT = rb'(?:[0-9]|\xe0\xb9[\x90-\x99])'
+PAGE_MARKER = re.compile(rb'^==\s*(?:' + re.escape('หน้า'.encode('utf-8')) + rb'|Page)\s*(' + PAGE_DIGIT + rb'+)\s*==[ \t]*\r?$', re.M)
+HEADING = re.compile(rb'^(#{1,6})[ \t]+(.+?)[ \t#]*\r?$', re.M)
+# Clause references ("ข้อ 5", "มาตรา ๑๐๒"), wherever they appear in a line
+CLAUSE_WORDS = ("ข้อ", "มาตรา")
+CLAUSE = re.compile(rb'(' + b'|'.join(re.escape(w.encode('utf-8')) for w in CLAUSE_WORDS)
+                    + rb')[ \t]*(' + PAGE_DIGIT + rb'+)')
+CLAUSE_QUERY = re.compile(r'^\s*(' + '|'.join(CLAUSE_WORDS) + r')\s*([0-9๐-๙]+)\s*$')
+NEWLINE = re.compile(rb'\n')
+THAI_DIGITS = str.maketrans("0123456789", "๐๑๒๓๔๕๖๗๘๙")
+ARABIC_DIGITS = str.maketrans("๐๑๒๓๔๕๖๗๘๙", "0123456789")
+CONTEXT_LINES = 10
+
+def index_path(path):
+    name = hashlib.sha256(os.path.abspath(path).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(INDEX_DIR, name + ".idx")
+
+def build_index(mm, st):
+    """Scan a mapped text once: line start offsets, page markers, headings
+    and clause references.
+
+    Pages, headings and clauses are stored as [line number, ...] (0-based
+    lines), clauses as [line, word, number] in order of appearance.
+    """
+    lines = array('Q', [0])
+    lines.extend(m.end() for m in NEWLINE.finditer(mm))
+    if lines[-1] == len(mm) and len(lines) > 1:
+        lines.pop()  # no empty line after a trailing newline
+
+    def line_of(offset):
+        return bisect.bisect_right(lines, offset) - 1
+
+    pages = [[line_of(m.start()), int(m.group(1).decode('utf-8'))] for m in PAGE_MARKER.finditer(mm)]
+    headings = [[line_of(m.start()), len(m.group(1)), m.group(2).decode('utf-8', errors='replace')]
+                for m in HEADING.finditer(mm)]
+    clauses = [[line_of(m.start()), m.group(1).decode('utf-8'), int(m.group(2).decode('utf-8'))]
+               for m in CLAUSE.finditer(mm)]
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "lines": lines,
+            "pages": pages, "headings": headings, "clauses": clauses}
+
+def save_index(path, index):
+    # One JSON header line, then the line offsets as raw 64-bit integers
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    header = {k: v for k, v in index.items() if k != "lines"}
+    header["version"] = INDEX_VERSION
+    file_state.atomic_write(path, json.dumps(header, ensure_ascii=False).encode('utf-8') + b"\n"
+                            + index["lines"].tobytes())
+
+def load_index(path, st):
+    try:
+        with open(path, 'rb') as f:
+            header = json.loads(f.readline())
+            if (header.get("version") != INDEX_VERSION or header.get("size") != st.st_size
+                    or header.get("mtime_ns") != st.st_mtime_ns):
+                return None
+            lines = array('Q')
+            lines.frombytes(f.read())
+    except (OSError, ValueError):
+        return None
+    header["lines"] = lines
+    return header
+
+def open_text(path):
+    """(mmap, index) for a text file; the index is built on first use and
+    reused while the file's size and mtime stay the same."""
+    st = os.stat(path)
+    with open(path, 'rb') as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if st.st_size else b""
+    cached = index_path(path)
+    index = load_index(cached, st)
+    if index is None:
+        index = build_index(mm, st)
+        save_index(cached, index)
+    return mm, index
+
+def line_count(index):
+    return len(index["lines"])
+
+def read_lines(mm, index, first, last):
+    """Text of lines first..last (0-based, inclusive), sliced from the map."""
+    lines = index["lines"]
+    last = min(last, len(lines) - 1)
+    if first > last:
+        return ""
+    end = lines[last + 1] if last + 1 < len(lines) else len(mm)
+    return mm[lines[first]:end].decode('utf-8', errors='replace')
+
+def page_lines(index, number):
+    """(first, last) lines of page `number`, marker line included."""
+    pages = index["pages"]
+    for i, (line, page) in enumerate(pages):
+        if page == number:
+            last = pages[i + 1][0] - 1 if i + 1 < len(pages) else line_count(index) - 1
+            return line, last
+    return None
+
+def find_term(mm, term, start=0):
+    # Byte offset of the first match, trying the term with Thai and with
+    # Arabic digits ("ข้อ 5" also finds "ข้อ ๕")
+    hits = []
+    for variant in {term, term.translate(THAI_DIGITS), term.translate(ARABIC_DIGITS)}:
+        pos = mm.find(variant.encode('utf-8'), start)
+        if pos >= 0:
+            hits.append(pos)
+    return min(hits) if hits else -1
+
+def enclosing(starts, line, last_line):
+    # (first, last) of the span in `starts` (sorted line numbers) holding line
+    i = bisect.bisect_right(starts, line) - 1
+    if i < 0:
+        return None
+    last = starts[i + 1] - 1 if i + 1 < len(starts) else last_line
+    return starts[i], last
+
+def section_lines(index, line):
+    """Lines of the part of the text containing `line`: its heading's
+    section, else its page, else a few lines either side."""
+    last_line = line_count(index) - 1
+    for starts in ([h[0] for h in index["headings"]], [p[0] for p in index["pages"]]):
+        span = enclosing(starts, line, last_line)
+        if span:
+            return span
+    return max(0, line - CONTEXT_LINES), min(last_line, line + CONTEXT_LINES)
+
+def indexed_line(index, term):
+    """Line of a clause reference ("ข้อ 5", either digits) or a heading
+    title, from the index alone. (None, False) when term is neither;
+    (None, True) for a clause the text never mentions."""
+    query = CLAUSE_QUERY.match(term)
+    if query:
+        word, number = query.group(1), int(query.group(2))
+        for line, w, n in index["clauses"]:
+            if w == word and n == number:
+                return line, True
+        return None, True
+    for line, level, title in index["headings"]:
+        if title.strip() == term.strip():
+            return line, True
+    return None, False
+
+def find_section(mm, index, term):
+    """(first, last) lines of the section holding the first match of term.
+
+    Clauses and headings are looked up in the index; any other text is
+    searched for in the mapped file.
+    """
+    line, indexed = indexed_line(index, term)
+    if line is None:
+        if indexed:
+            return None
+        pos = find_term(mm, term)
+        if pos < 0:
+            return None
+        line = bisect.bisect_right(index["lines"], pos) - 1
+    return section_lines(index, line)
+
+def parse_line_range(spec):
+    """'1200-1300' -> (1200, 1300), '42' -> (42, 42). Lines are 1-based."""
+    start, sep, end = spec.partition('-')
+    try:
+        first = int(start)
+        last = int(end) if sep else first
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid line range: {spec!r}")
+    if first < 1 or last < first:
+        raise argparse.ArgumentTypeError(f"invalid line range: {spec!r}")
+    return first, last
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Pull exact passages out of large reference texts through a line/page/clause index.")
+    parser.add_argument("file", help="text file, e.g. references/notifyIn15Day.md")
+    query = parser.add_mutually_exclusive_group()
+    query.add_argument("--page", type=int, help="one page (==หน้า N== markers)")
+    query.add_argument("--lines", type=parse_line_range, help="line range, e.g. 1200-1300 (1-based)")
+    query.add_argument("--section", metavar="TEXT", help="the section (or page) containing TEXT, e.g. \"ข้อ 5\"")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.file):
+        print(f"Error: file not found: {args.file}", file=sys.stderr)
+        sys.exit(1)
+    mm, index = open_text(args.file)
+
+    if args.page is not None:
+        span = page_lines(index, args.page)
+        if span is None:
+            print(f"ไม่พบหน้า {args.page}", file=sys.stderr)
+            sys.exit(1)
+    elif args.lines:
+        span = (args.lines[0] - 1, args.lines[1] - 1)
+    elif args.section:
+        span = find_section(mm, index, args.section)
+        if span is None:
+            print(f"ไม่พบ \"{args.section}\"", file=sys.stderr)
+            sys.exit(1)
+    else:
+        # No query: describe the file
+        print(f"📄 {args.file}: {line_count(index)} lines, {len(index['pages'])} pages, "
+              f"{len(index['headings'])} headings")
+        for line, level, title in index["headings"]:
+            print(f"   {line + 1:>6}  {'#' * level} {title}")
+        return
+
+    text = read_lines(mm, index, *span)
+    try:
+        sys.stdout.write(text if text.endswith("\n") or not text else text + "\n")
+    except BrokenPipeError:
+        sys.stderr.close()
+
+if __name__ == "__main__":
+    main()
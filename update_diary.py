@@ -3,76 +3,152 @@ import datetime
 import os
 import subprocess
 import re
+import bisect
 
-DIARY_FILE = "git_diary.md"
+import diary_store
+import ppp_trace
 
 def get_thai_date():
-    months = [
-        "มกราคม", "กุมภาพันธ์", "มีนาคม", "เมษายน", "พฤษภาคม", "มิถุนายน",
-        "กรกฎาคม", "สิงหาคม", "กันยายน", "ตุลาคม", "พฤศจิกายน", "ธันวาคม"
-    ]
+    months = diary_store.THAI_MONTHS
     now = datetime.datetime.now()
     return f"{now.day} {months[now.month-1]} {now.year}"
 
+def get_iso_date():
+    return datetime.date.today().isoformat()
+
 def get_time_str():
     return datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
 
+# Parsed `git diff --cached`, shared by every caller in this process
+_staged = None
+
+def parse_staged_diff(output):
+    """Split a full `git diff -U0` into {path: (status, patch)}."""
+    files = {}
+    for block in re.split(r'^(?=diff --git )', output, flags=re.M):
+        if not block.startswith("diff --git "):
+            continue
+        # "diff --git a/<path> b/<path>" (renames are off, so both match)
+        names = block.split("\n", 1)[0][len("diff --git "):]
+        path = names[2:2 + (len(names) - 5) // 2]
+        status = "M"
+        for line in block.split("\n"):
+            if line.startswith("@@"):
+                break
+            if line.startswith("new file mode"):
+                status = "A"
+            elif line.startswith("deleted file mode"):
+                status = "D"
+            elif line.startswith("+++ b/"):
+                path = line[len("+++ b/"):].rstrip("\t")
+            elif line.startswith("--- a/") and status == "D":
+                path = line[len("--- a/"):].rstrip("\t")
+        files[path] = (status, block)
+    return files
+
+def staged_diff():
+    """All staged changes from one `git diff --cached` call (cached)."""
+    global _staged
+    if _staged is None:
+        try:
+            with ppp_trace.stage("git diff --cached"):
+                output = subprocess.check_output(
+                    ["git", "-c", "core.quotepath=false", "diff", "--cached", "-U0",
+                     "--no-color", "--no-renames", "--no-ext-diff"],
+                    encoding="utf-8", errors="replace")
+        except:
+            output = ""
+        _staged = parse_staged_diff(output)
+    return _staged
+
+def forget_staged_diff():
+    # Call after staging more files in the same process
+    global _staged
+    _staged = None
+
 def run_git_diff():
-    try:
-        # Get status of staged files
-        result = subprocess.check_output(["git", "diff", "--cached", "--name-status"], encoding="utf-8")
-        return [line.split('\t') for line in result.strip().split('\n') if line.strip()]
-    except:
-        return []
+    # Get status of staged files: [[status, path], ...]
+    return [[status, path] for path, (status, _) in staged_diff().items()]
+
+# Sections named in the suggested message (the details list them all)
+MESSAGE_SECTIONS = 3
+
+HUNK_HEADER = re.compile(r'^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@', re.M)
+
+def heading_index(lines):
+    """Line numbers (1-based, ascending) and titles of every heading."""
+    starts, titles = [], []
+    for num, line in enumerate(lines, 1):
+        line = line.strip()
+        if line.startswith("#"):
+            starts.append(num)
+            titles.append(line.lstrip("#").strip())
+    return starts, titles
+
+def touched_sections(patch, index):
+    """Titles of every section a `-U0` patch touches, in file order.
+
+    Each hunk covers new-file lines [start, start + count - 1] (a pure
+    deletion sits at `start`); its sections are the heading enclosing the
+    first line plus any headings inside the range, both found by bisect.
+    Lines before the first heading map to None.
+    """
+    starts, titles = index
+    touched = set()
+    for match in HUNK_HEADER.finditer(patch):
+        first = int(match.group(1))
+        count = int(match.group(2)) if match.group(2) is not None else 1
+        last = max(first, first + count - 1)
+        # -1 is the preamble before the first heading
+        touched.update(range(bisect.bisect_right(starts, first) - 1,
+                             bisect.bisect_right(starts, last)))
+    return [titles[i] if i >= 0 else None for i in sorted(touched)]
+
+def added_items(patch, limit=2):
+    # First few meaningful added lines of a patch
+    items = []
+    for line in patch.split('\n'):
+        if line.startswith('+') and not line.startswith('+++') and len(line) > 2:
+            clean_line = line[1:].strip().replace('*', '').replace('-', '').strip()
+            if clean_line:
+                items.append(clean_line)
+                if len(items) == limit:
+                    break
+    return items
 
 def analyze_markdown_changes(filepath):
+    """(sections, items) for the staged changes to one article: every
+    touched section title in file order, and the first added lines."""
     try:
-        # Get diff content to see which lines changed
-        diff = subprocess.check_output(["git", "diff", "--cached", "-U0", filepath], encoding="utf-8")
-        
-        # Determine changed line number (first match)
-        match = re.search(r'@@ -\d+(?:,\d+)? \+(\d+)(?:,\d+)? @@', diff)
-        if not match:
+        patch = staged_diff().get(filepath, (None, ""))[1]
+        if not HUNK_HEADER.search(patch):
             return None
-        
-        changed_line_num = int(match.group(1))
-        
-        with open(filepath, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-        
-        # 1. Find Header (Context)
-        current_header = None
-        for i in range(min(changed_line_num - 1, len(lines) - 1), -1, -1):
-            line = lines[i].strip()
-            if line.startswith("#"):
-                current_header = line.lstrip("#").strip()
-                break
 
-        # 2. Extract Added Content (Summary)
-        # Look for lines starting with '+' in diff, exclude '+++' header and empty lines
-        added_lines = []
-        for line in diff.split('\n'):
-            if line.startswith('+') and not line.startswith('+++') and len(line) > 2:
-                clean_line = line[1:].strip().replace('*', '').replace('-', '').strip()
-                if clean_line:
-                    added_lines.append(clean_line)
-        
-        # Summarize content (take first 2 meaningful lines)
-        content_summary = ""
-        if added_lines:
-            content_summary = " (Items: " + ", ".join(added_lines[:2]) + ")"
-        
-        if current_header:
-            return f"{current_header}{content_summary}"
-        return f"อัปเดตทั่วไป{content_summary}"
+        with open(filepath, 'r', encoding='utf-8') as f:
+            index = heading_index(f.readlines())
+        sections = [s for s in touched_sections(patch, index) if s]
+        return sections, added_items(patch)
     except:
         return None
 
-def suggest_mode():
+def describe_changes(sections, items, max_sections=None):
+    # "Section A, Section B (Items: first, second)"
+    shown = sections if max_sections is None else sections[:max_sections]
+    text = ", ".join(shown) or "อัปเดตทั่วไป"
+    if len(shown) < len(sections):
+        text += f" และอีก {len(sections) - len(shown)} ส่วน"
+    if items:
+        text += " (Items: " + ", ".join(items) + ")"
+    return text
+
+def suggest():
+    """Guess (category, message, details) from the staged changes.
+
+    details uses a literal "\\n" between lines, as passed on the command line.
+    """
     changes = run_git_diff()
     if not changes:
-        print("system|Log: บันทึกเพิ่มเติมก่อน Push|No changes detected")
-        return
+        return "system", "Log: บันทึกเพิ่มเติมก่อน Push", "No changes detected"
 
     # Heuristic Analysis
     category = "system"
@@ -85,10 +161,12 @@ def suggest_mode():
         category = "content"
         for f in content_files:
             filename = os.path.basename(f)
-            header = analyze_markdown_changes(f)
-            if header:
-                messages.append(f"แก้ไข {filename}: {header}")
-                details.append(f"📝 แก้ไข: {filename} (ส่วน: {header})")
+            analysis = analyze_markdown_changes(f)
+            if analysis:
+                # All touched sections go to the details; the message
+                # (which becomes the commit subject) lists only a few
+                messages.append(f"แก้ไข {filename}: {describe_changes(*analysis, max_sections=MESSAGE_SECTIONS)}")
+                details.append(f"📝 แก้ไข: {filename} (ส่วน: {describe_changes(*analysis)})")
             else:
                 messages.append(f"แก้ไข {filename}")
                 details.append(f"📝 แก้ไข: {filename}")
@@ -112,7 +190,11 @@ def suggest_mode():
         
     final_details = "\\n".join(details)
     
-    print(f"{category}|{final_message}|{final_details}")
+    return category, final_message, final_details
+
+def suggest_mode():
+    category, message, details = suggest()
+    print(f"{category}|{message}|{details}")
 
 def summary_mode():
     print("\n📝 **Daily Retrospective (สรุปภาพรวมประจำวัน)**")
@@ -148,118 +230,40 @@ def summary_mode():
          print("❌ ไม่มีการกรอกข้อมูลสรุป ยกเลิกการอัปเดตสรุปประจำวัน")
          return
 
-    # Update Diary File
-    if not os.path.exists(DIARY_FILE):
-        print(f"❌ ไม่พบไฟล์ {DIARY_FILE}")
-        return
-
-    with open(DIARY_FILE, "r", encoding="utf-8") as f:
-        lines = f.readlines()
-
     today_date = get_thai_date()
     header_date = f"## 📅 {today_date}"
-    
-    # Logic to replace summary
-    # Find Date Header
-    date_idx = -1
-    for i, line in enumerate(lines):
-        if line.strip() == header_date:
-            date_idx = i
-            break
-    
-    if date_idx == -1:
-        # Create new date section (should be unusual for end of day, but handle it)
-         if lines and lines[-1].strip() != "":
-            lines.append("\n")
-         lines.append(f"{header_date}\n")
-         lines.append(f"{summary_md}")
-         lines.append(f"### 📝 บันทึกการปฏิบัติงาน (Operations Log)\n") # Add log header if new
-         print("⚠️ สร้างหัวข้อวันที่ใหม่ (ปกติควรมีอยู่แล้วจากการทำงานระหว่างวัน)")
-    else:
-        # Date exists. Look for the "Summary" section to replace.
-        # It usually starts after date header and ends before "### 📝 บันทึกการปฏิบัติงาน"
-        
-        start_replace = date_idx + 1
-        end_replace = start_replace
-        
-        # Heuristic: Find where the operations log starts
-        log_header_marker = "### 📝 บันทึกการปฏิบัติงาน"
-        
-        for i in range(start_replace, len(lines)):
-            if lines[i].strip().startswith(log_header_marker):
-                end_replace = i
-                break
-            # Safety break if we hit next date
-            if lines[i].strip().startswith("## 📅"):
-                 end_replace = i
-                 break
-        
-        # Replace the range [start_replace:end_replace] with new summary
-        # But allow keeping lines that are NOT the old summary boilerplate if impactful?
-        # For simplicity and robustness, we overwrite the "Summary Block".
-        
-        # Construct the new specific block
-        lines[start_replace:end_replace] = [s + "\n" for s in summary_md.split('\n')]
 
-    with open(DIARY_FILE, "w", encoding="utf-8") as f:
-        f.writelines(lines)
+    # Only today's section of this month's shard is re-rendered;
+    # a later summary replaces an earlier one
+    with ppp_trace.stage("diary rewrite"):
+        diary_store.add_record(get_iso_date(), header_date,
+                               {"type": "summary", "markdown": summary_md + "\n"})
         
     print("✅ อัปเดตสรุปภาพรวมประจำวันเรียบร้อย")
 
-def read_latest_mode():
-    if not os.path.exists(DIARY_FILE):
-        print(f"❌ ไม่พบไฟล์ {DIARY_FILE}")
-        return
-
-    with open(DIARY_FILE, "r", encoding="utf-8") as f:
-        lines = f.readlines()
+def read_latest_mode(days=1):
+    # Newest day is at the top of the newest month; only the head of each
+    # shard is read, walking back through older months if needed
+    sections = []
+    for month in diary_store.list_months():
+        if days <= 0:
+            break
+        text, found = diary_store.read_head_days(diary_store.shard_file(month), days)
+        if found:
+            sections.append(text.strip())
+            days -= found
 
-    found_first_date = False
-    printed_lines = []
-    
-    for line in lines:
-        if line.strip().startswith("## 📅"):
-            if found_first_date:
-                # Found the *second* date, stop
-                break
-            found_first_date = True
-        
-        if found_first_date:
-            printed_lines.append(line)
-            
-    if not printed_lines:
+    if not sections:
         print("ยังไม่มีบันทึกประจำวัน")
     else:
-        print("".join(printed_lines).strip())
-
-
-def main():
-    if len(sys.argv) > 1:
-        if sys.argv[1] == "--suggest":
-            suggest_mode()
-            sys.exit(0)
-        elif sys.argv[1] == "--summary":
-            summary_mode()
-            sys.exit(0)
-        elif sys.argv[1] == "--read-latest":
-            read_latest_mode()
-            sys.exit(0)
-
-    if len(sys.argv) < 3:
-        print("Usage: python3 update_diary.py <category> <message> [details]")
-        sys.exit(1)
+        print("\n\n".join(sections))
 
-    category_code = sys.argv[1] # 'content' or 'system'
-    message = sys.argv[2]
-    details = sys.argv[3] if len(sys.argv) > 3 else ""
 
+def add_entry(category_code, message, details=""):
     today_date = get_thai_date()
     # Format: ## 📅 12 ธันวาคม 2025
     header_date = f"## 📅 {today_date}"
     
-    # New Standard Header for Logs
-    log_header = "### 📝 บันทึกการปฏิบัติงาน (Operations Log)"
-    
     # Icon mapping
     icon = "📌"
     if category_code == "content":
@@ -298,8 +302,9 @@ def main():
              entry_body.extend([f"    {l}" for l in file_info])
     
     # Auto-detect files if not explicitly mentioned (Simple heuristic)
+    files = []
     try:
-        files = [line.split('\t')[1] for line in run_git_diff() if len(line.split('\t')) > 1]
+        files = [change[1] for change in run_git_diff() if len(change) > 1]
         if files:
             file_list = ", ".join([f"`{os.path.basename(f)}`" for f in files])
             # Avoid duplicate file listing if possible, but keep specific changes
@@ -310,71 +315,64 @@ def main():
 
     full_entry = f"{entry_header}\n" + "\n".join(entry_body) + "\n"
 
-    # Read file
-    if not os.path.exists(DIARY_FILE):
-        lines = []
-    else:
-        with open(DIARY_FILE, "r", encoding="utf-8") as f:
-            lines = f.readlines()
-
-    # Logic to insert
-    # 1. Find Date Header
-    date_found_idx = -1
-    for i, line in enumerate(lines):
-        if line.strip() == header_date:
-            date_found_idx = i
-            break
-    
-    if date_found_idx == -1:
-        # Create new date section
-        new_section = []
-        new_section.append(f"\n{header_date}\n")
-        new_section.append(f"**🤖 สรุปภาพรวมประจำวัน:**\n(รอสรุป...)\n\n")
-        new_section.append(f"{log_header}\n")
-        new_section.append(full_entry)
-        new_section.append("\n### ⏭️ ก้าวต่อไป (Next Steps)\n- [ ] ...\n")
-        new_section.append("---")
-        
-        # Insert after the main header (usually line 0 or 1)
-        # Find the first line starting with '# ' and sub-header if any
-        insert_idx = 0
-        for i, line in enumerate(lines):
-            if line.startswith("# "):
-                 insert_idx = i + 1
-                 # Maybe allow for some spacing
-                 if insert_idx < len(lines) and lines[insert_idx].strip() == "":
-                     insert_idx += 1
-                 break
-        
-        lines[insert_idx:insert_idx] = new_section
-    else:
-        # Date exists, find Log Header
-        log_found_idx = -1
-        
-        for i in range(date_found_idx + 1, len(lines)):
-            if lines[i].strip() == log_header:
-                log_found_idx = i
-                break
-            if lines[i].strip().startswith("## "): # Next date safety check
-                break
-                
-        if log_found_idx != -1:
-            # Insert AT THE TOP of the log section (LIFO)
-            insert_pos = log_found_idx + 1
-            lines.insert(insert_pos, f"{full_entry}")
-               
-        else:
-            # Date exists but no Log header (weird), Insert after Summary
-            insert_pos = date_found_idx + 1
-            while insert_pos < len(lines) and not lines[insert_pos].strip().startswith("###"):
-                 insert_pos += 1
-            
-            lines.insert(insert_pos, f"\n{log_header}\n{full_entry}\n")
-
-    with open(DIARY_FILE, "w", encoding="utf-8") as f:
-        f.writelines(lines)
+    # Store the entry and re-render only today's section of this month's
+    # shard (LIFO within the day)
+    with ppp_trace.stage("diary rewrite"):
+        diary_store.add_record(get_iso_date(), header_date, {
+            "type": "entry",
+            "time": time_str,
+            "category": category_code,
+            "icon": icon,
+            "message": message,
+            "details": details,
+            "files": files,
+            "markdown": full_entry,
+        })
     
     print(f"✅ บันทึก '{message}' เรียบร้อย")
 
+def main():
+    # --profile / --cprofile (or PPP_TRACE=1): write a timing trace at exit
+    sys.argv, profile, cprofile = ppp_trace.strip_flags(sys.argv)
+    ppp_trace.start("update_diary", profile, cprofile)
+
+    if len(sys.argv) > 1:
+        if sys.argv[1] == "--suggest":
+            with ppp_trace.stage("suggest"):
+                suggest_mode()
+            sys.exit(0)
+
+    # One-off: split an old single-file diary into monthly shards
+    with ppp_trace.stage("diary migrate"):
+        moved = diary_store.migrate_legacy()
+    if moved:
+        print(f"📦 แยกบันทึกเป็นรายเดือนใน {diary_store.DIARY_DIR}/ เรียบร้อย")
+
+    if len(sys.argv) > 1:
+        if sys.argv[1] == "--summary":
+            summary_mode()
+            sys.exit(0)
+        elif sys.argv[1] == "--read-latest":
+            # Optional: --days N (default 1)
+            days = 1
+            if "--days" in sys.argv:
+                try:
+                    days = int(sys.argv[sys.argv.index("--days") + 1])
+                except (IndexError, ValueError):
+                    print("Usage: python3 update_diary.py --read-latest [--days N]")
+                    sys.exit(1)
+            with ppp_trace.stage("read latest"):
+                read_latest_mode(days)
+            sys.exit(0)
+
+    if len(sys.argv) < 3:
+        print("Usage: python3 update_diary.py <category> <message> [details]")
+        sys.exit(1)
+
+    category_code = sys.argv[1] # 'content' or 'system'
+    message = sys.argv[2]
+    details = sys.argv[3] if len(sys.argv) > 3 else ""
+    add_entry(category_code, message, details)
+
 if __name__ == "__main__":
     main()